@@ -0,0 +1,418 @@
+"""
+Headless review sort order simulator.
+
+Replays the unweighted setting of review-sort-order-comparison: a deck of new cards is learned at a
+fixed daily pace, and every day the due cards are reviewed in the order under test until the
+review limit is reached. Each (order, seed) run is independent and runs on a process pool.
+
+Usage:
+    python evaluation/simulate.py
+    python evaluation/simulate.py --orders knowledge_gain_discounted_desc,due_date_asc --seeds 1,2,3
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, Sequence
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from fsrs.fsrs6 import D_MAX, D_MIN, S_MAX, S_MIN  # noqa: E402
+from fsrs.types import StateBatch  # noqa: E402
+from longterm_knowledge.delayed.fsrs6 import FSRS6KnowledgeDelayed  # noqa: E402
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted  # noqa: E402
+from longterm_knowledge.ranking import top_k  # noqa: E402
+
+# FSRS-6 default parameters, used both for the simulated student and for scoring
+DEFAULT_PARAMS = (
+    0.212, 1.2931, 2.3065, 8.2956, 6.4133, 0.8334, 3.0194, 0.001, 1.8722, 0.1666, 0.796,
+    1.4835, 0.0614, 0.2629, 1.6483, 0.6014, 1.8729, 0.5425, 0.0912, 0.0658, 0.1542,
+)  # fmt: skip
+
+FIRST_RATING_PROBS = (0.24, 0.094, 0.495, 0.171)
+# Probabilities of Hard, Good and Easy given a successful recall
+RECALL_RATING_PROBS = (0.224, 0.631, 0.145)
+
+ORDERS = [
+    "knowledge_gain_delayed_desc",
+    "knowledge_gain_discounted_desc",
+    "due_date_asc",
+    "interval_asc",
+    "interval_desc",
+    "difficulty_asc",
+    "difficulty_desc",
+    "retrievability_asc",
+    "retrievability_desc",
+    "stability_asc",
+    "stability_desc",
+    "random",
+    "add_order_asc",
+    "add_order_desc",
+    "PRL_desc",
+    "PSG_desc",
+]
+
+
+@dataclass(frozen=True)
+class Settings:
+    deck_size: int = 20000
+    learn_limit: int = 20
+    review_limit: int = 80
+    desired_retention: float = 0.8
+    # Defaults to the number of days needed to learn the whole deck
+    days: Optional[int] = None
+
+    @property
+    def learn_span(self) -> int:
+        return self.days or math.ceil(self.deck_size / self.learn_limit)
+
+
+@dataclass(frozen=True)
+class Result:
+    order: str
+    seed: int
+    total_learned: int
+    total_time: float
+    total_remembered: float
+    average_true_retention: float
+    seconds: float
+
+    @property
+    def seconds_per_remembered_card(self) -> float:
+        return self.total_time / self.total_remembered if self.total_remembered else math.inf
+
+
+class Deck:
+    """Memory states of the simulated cards, as parallel arrays indexed by card id."""
+
+    def __init__(self, settings: Settings, params: tuple[float, ...]):
+        n = settings.deck_size
+        self.params = params
+        self.decay = -params[20]
+        self.factor = 0.9 ** (1 / self.decay) - 1
+        self.desired_retention = settings.desired_retention
+        # Exam date of the delayed knowledge order: the end of the simulation
+        self.exam_day = settings.learn_span
+
+        self.difficulties = array("d", bytes(8 * n))
+        self.stabilities = array("d", bytes(8 * n))
+        self.last_dates = array("l", bytes(array("l").itemsize * n))
+        self.dues = array("l", bytes(array("l").itemsize * n))
+        self.intervals = array("l", bytes(array("l").itemsize * n))
+        self.learned = 0
+
+    def retrievability(self, card: int, day: float) -> float:
+        stability = self.stabilities[card]
+        if stability <= 0:
+            return 0.0
+        return (1 + self.factor * (day - self.last_dates[card]) / stability) ** self.decay
+
+    def next_interval(self, stability: float) -> int:
+        interval = stability / self.factor * (self.desired_retention ** (1 / self.decay) - 1)
+        return max(1, round(interval))
+
+    def learn(self, card: int, day: int, rating: int) -> None:
+        w = self.params
+        self.stabilities[card] = min(S_MAX, max(S_MIN, w[rating - 1]))
+        self.difficulties[card] = min(D_MAX, max(D_MIN, w[4] - math.exp(w[5] * (rating - 1)) + 1))
+        self._schedule(card, day)
+
+    def review_batch(self, cards: Sequence[int], day: int, ratings: Sequence[int]) -> None:
+        """Update the memory states of the cards reviewed on `day` with the given ratings."""
+        w = self.params
+        exp = math.exp
+        D04 = w[4] - exp(w[5] * 3) + 1
+        exp_w8 = exp(w[8])
+
+        for card, rating in zip(cards, ratings):
+            D, S = self.difficulties[card], self.stabilities[card]
+            R = self.retrievability(card, day)
+
+            difficulty = D - w[6] * (rating - 3) * (10 - D) / 9
+            difficulty = w[7] * D04 + (1 - w[7]) * difficulty
+
+            if day - self.last_dates[card] < 1:
+                stability = S * exp(w[17] * (rating - 3 + w[18])) * S ** (-w[19])
+            elif rating == 1:
+                stability = w[11] * D ** (-w[12]) * ((S + 1) ** w[13] - 1) * exp(w[14] * (1 - R))
+            else:
+                stability = S * (
+                    exp_w8
+                    * (11 - D)
+                    * S ** (-w[9])
+                    * (exp(w[10] * (1 - R)) - 1)
+                    * (w[15] if rating == 2 else 1)
+                    * (w[16] if rating == 4 else 1)
+                    + 1
+                )
+
+            self.difficulties[card] = min(D_MAX, max(D_MIN, difficulty))
+            self.stabilities[card] = min(S_MAX, max(S_MIN, stability))
+            self._schedule(card, day)
+
+    def _schedule(self, card: int, day: int) -> None:
+        interval = self.next_interval(self.stabilities[card])
+        self.last_dates[card] = day
+        self.intervals[card] = interval
+        self.dues[card] = day + interval
+
+
+def _recall_stability(deck: Deck, card: int, day: int) -> float:
+    """Stability after a Good review, for the PSG order."""
+    w = deck.params
+    D, S = deck.difficulties[card], deck.stabilities[card]
+    R = deck.retrievability(card, day)
+    return S * (math.exp(w[8]) * (11 - D) * S ** (-w[9]) * (math.exp(w[10] * (1 - R)) - 1) + 1)
+
+
+Selector = Callable[[Deck, list[int], int, int, random.Random], list[int]]
+
+
+def _select_by_key(key: Callable[[Deck, int, int], float], descending: bool) -> Selector:
+    def select(deck, backlog, day, limit, rng):
+        sign = -1.0 if descending else 1.0
+        return heapq.nsmallest(limit, backlog, key=lambda card: sign * key(deck, card, day))
+
+    return select
+
+
+def _select_random(deck, backlog, day, limit, rng):
+    return rng.sample(backlog, min(limit, len(backlog)))
+
+
+def _backlog_states(deck, backlog, day):
+    """Memory states and elapsed days of the backlog, whose slices are scored as chunks."""
+    return StateBatch(
+        [deck.difficulties[card] for card in backlog],
+        [deck.stabilities[card] for card in backlog],
+        [float(day - deck.last_dates[card]) for card in backlog],
+    )
+
+
+def _select_knowledge_gain_discounted(deck, backlog, day, limit, rng):
+    fsrs = FSRS6KnowledgeDiscounted.from_tuple(deck.params)
+    states = _backlog_states(deck, backlog, day)
+
+    def score(indices):
+        return fsrs.exp_knowledge_gain_batch(_take(states, indices), lookahead=2)
+
+    # Only cards whose upper bound can beat the review limit's worst card get scored
+    bounds = fsrs.exp_knowledge_gain_bound_batch(states)
+
+    return [backlog[i] for i, _ in top_k(range(len(backlog)), limit, score, bounds=bounds)]
+
+
+def _select_knowledge_gain_delayed(deck, backlog, day, limit, rng):
+    fsrs = FSRS6KnowledgeDelayed.from_tuple_with_due(deck.params, due=float(deck.exam_day))
+    states = _backlog_states(deck, backlog, day)
+    todays = [float(day + 1)] * len(backlog)
+
+    def score(indices):
+        return fsrs.exp_knowledge_gain_future_batch(
+            _take(states, indices), [todays[i] for i in indices]
+        )
+
+    bounds = fsrs.exp_knowledge_gain_bound_batch(states, todays)
+
+    return [backlog[i] for i, _ in top_k(range(len(backlog)), limit, score, bounds=bounds)]
+
+
+def _take(states, indices):
+    """Rows `indices` of a StateBatch; top_k scores in order of bound, not in slices."""
+    return StateBatch(
+        [states.difficulties[i] for i in indices],
+        [states.stabilities[i] for i in indices],
+        [states.elapsed_days[i] for i in indices],
+    )
+
+
+SELECTORS: dict[str, Selector] = {
+    "knowledge_gain_discounted_desc": _select_knowledge_gain_discounted,
+    "knowledge_gain_delayed_desc": _select_knowledge_gain_delayed,
+    "random": _select_random,
+    "due_date_asc": _select_by_key(lambda deck, card, day: deck.dues[card], False),
+    "interval_asc": _select_by_key(lambda deck, card, day: deck.intervals[card], False),
+    "interval_desc": _select_by_key(lambda deck, card, day: deck.intervals[card], True),
+    "difficulty_asc": _select_by_key(lambda deck, card, day: deck.difficulties[card], False),
+    "difficulty_desc": _select_by_key(lambda deck, card, day: deck.difficulties[card], True),
+    "stability_asc": _select_by_key(lambda deck, card, day: deck.stabilities[card], False),
+    "stability_desc": _select_by_key(lambda deck, card, day: deck.stabilities[card], True),
+    "retrievability_asc": _select_by_key(Deck.retrievability, False),
+    "retrievability_desc": _select_by_key(Deck.retrievability, True),
+    "add_order_asc": _select_by_key(lambda deck, card, day: card, False),
+    "add_order_desc": _select_by_key(lambda deck, card, day: card, True),
+    "PRL_desc": _select_by_key(
+        lambda deck, card, day: deck.retrievability(card, day)
+        - deck.retrievability(card, day + 1),
+        True,
+    ),
+    "PSG_desc": _select_by_key(
+        lambda deck, card, day: _recall_stability(deck, card, day)
+        * deck.retrievability(card, day)
+        / deck.stabilities[card],
+        True,
+    ),
+}
+
+
+def simulate(order: str, seed: int, settings: Settings, params=DEFAULT_PARAMS) -> Result:
+    """Run one simulation of `settings.learn_span` days with the given review order."""
+    tic = time.perf_counter()
+    rng = random.Random(seed)
+    select = SELECTORS[order]
+    deck = Deck(settings, params)
+
+    # Cards not yet due wait in a bucket per due day; due cards stay in the backlog until reviewed
+    buckets: dict[int, list[int]] = {}
+    backlog: list[int] = []
+    total_time = 0.0
+    retentions = []
+
+    for day in range(settings.learn_span):
+        backlog.extend(buckets.pop(day, []))
+
+        reviewed = select(deck, backlog, day, settings.review_limit, rng)
+        if reviewed:
+            retrievabilities = [deck.retrievability(card, day) for card in reviewed]
+            ratings = [
+                rng.choices((2, 3, 4), RECALL_RATING_PROBS)[0] if rng.random() < r else 1
+                for r in retrievabilities
+            ]
+            deck.review_batch(reviewed, day, ratings)
+            retentions.append(sum(retrievabilities) / len(reviewed))
+
+            reviewed_set = set(reviewed)
+            backlog = [card for card in backlog if card not in reviewed_set]
+            for card in reviewed:
+                buckets.setdefault(deck.dues[card], []).append(card)
+            total_time += len(reviewed)
+
+        # New cards are learned in add order, after the reviews
+        new_cards = range(
+            deck.learned, min(deck.learned + settings.learn_limit, settings.deck_size)
+        )
+        for card in new_cards:
+            deck.learn(card, day, rng.choices((1, 2, 3, 4), FIRST_RATING_PROBS)[0])
+            buckets.setdefault(deck.dues[card], []).append(card)
+        deck.learned += len(new_cards)
+        total_time += len(new_cards)
+
+    # Expected number of cards remembered at the end of the simulation
+    end = settings.learn_span
+    total_remembered = sum(deck.retrievability(card, end) for card in range(deck.learned))
+
+    return Result(
+        order=order,
+        seed=seed,
+        total_learned=deck.learned,
+        total_time=total_time,
+        total_remembered=total_remembered,
+        average_true_retention=sum(retentions) / len(retentions) if retentions else math.nan,
+        seconds=time.perf_counter() - tic,
+    )
+
+
+def _simulate_case(case: tuple[str, int, Settings]) -> Result:
+    return simulate(*case)
+
+
+def run(
+    orders: Sequence[str], seeds: Sequence[int], settings: Settings, workers: Optional[int] = None
+) -> list[Result]:
+    """Simulate every (order, seed) pair on a process pool."""
+    cases = [(order, seed, settings) for order in orders for seed in seeds]
+    # The knowledge gain orders are the slowest, so they start first
+    cases.sort(key=lambda case: not case[0].startswith("knowledge_gain"))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_simulate_case, cases))
+
+
+def summarize(results: Sequence[Result]) -> list[dict]:
+    """Average the results of each order over the seeds, best order first."""
+    by_order: dict[str, list[Result]] = {}
+    for result in results:
+        by_order.setdefault(result.order, []).append(result)
+
+    rows = []
+    for order, runs in by_order.items():
+        n = len(runs)
+        total_time = sum(r.total_time for r in runs) / n
+        total_remembered = sum(r.total_remembered for r in runs) / n
+        rows.append(
+            {
+                "order": order,
+                "total_learned": sum(r.total_learned for r in runs) / n,
+                "total_time": total_time,
+                "total_remembered": total_remembered,
+                "average_true_retention": sum(r.average_true_retention for r in runs) / n,
+                "seconds_per_remembered_card": total_time / total_remembered,
+            }
+        )
+
+    return sorted(rows, key=lambda row: row["seconds_per_remembered_card"])
+
+
+def format_table(rows: Sequence[dict]) -> str:
+    lines = [
+        "| order | total_learned | total_time | total_remembered | average_true_retention "
+        "| seconds_per_remembered_card |",
+        "|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        lines.append(
+            f"| {row['order']} | {row['total_learned']:.0f} | {row['total_time']:.1f} "
+            f"| {row['total_remembered']:.0f} | {row['average_true_retention']:.3f} "
+            f"| {row['seconds_per_remembered_card']:.2f} |"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", default=",".join(ORDERS), help="comma-separated orders")
+    parser.add_argument("--seeds", default="42", help="comma-separated random seeds")
+    parser.add_argument("--deck-size", type=int, default=Settings.deck_size)
+    parser.add_argument("--learn-limit", type=int, default=Settings.learn_limit)
+    parser.add_argument("--review-limit", type=int, default=Settings.review_limit)
+    parser.add_argument("--desired-retention", type=float, default=Settings.desired_retention)
+    parser.add_argument("--days", type=int, default=None, help="defaults to the learning span")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    parser.add_argument("--output", help="write the per-run results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    orders = args.orders.split(",")
+    unknown = [order for order in orders if order not in SELECTORS]
+    if unknown:
+        parser.error(f"unknown orders: {', '.join(unknown)}")
+
+    settings = Settings(
+        deck_size=args.deck_size,
+        learn_limit=args.learn_limit,
+        review_limit=args.review_limit,
+        desired_retention=args.desired_retention,
+        days=args.days,
+    )
+    seeds = [int(seed) for seed in args.seeds.split(",")]
+
+    tic = time.perf_counter()
+    results = run(orders, seeds, settings, workers=args.workers)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+
+    print(format_table(summarize(results)))
+    print(f"\n{len(results)} runs in {time.perf_counter() - tic:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
+import datetime
+
 from aqt import mw
 from aqt.qt import QAction
+from aqt.utils import getText, showWarning, tooltip
 
 from .config_manager import get_config
-from .reordering import init_reordering, update_reordering
+from .profiling import profiler
+from .reordering import init_reordering, reset_ranking, update_reordering
+from .ui_profiling import (
+    reset_profiling_statistics,
+    save_profiling_statistics,
+    show_profiling_statistics,
+)
 from .ui_review import init_ui_review_hook
 
 config = get_config()
+profiler.enabled = config.profiling
 
 
 def toggle_reorder_cards():
@@ -14,6 +24,34 @@ def toggle_reorder_cards():
     update_reordering()
 
 
+def set_exam_date():
+    text, accepted = getText(
+        "Exam date (YYYY-MM-DD), or leave empty to turn exam mode off:",
+        parent=mw,
+        default=config.exam_date or "",
+        title="Exam mode",
+    )
+    if not accepted:
+        return
+
+    text = text.strip()
+    if text:
+        try:
+            datetime.date.fromisoformat(text)
+        except ValueError:
+            showWarning(f"Invalid date: {text}", parent=mw)
+            return
+
+    config.exam_date = text or None
+    reset_ranking()
+    tooltip(f"Exam date set to {text}" if text else "Exam mode turned off", parent=mw)
+
+
+def toggle_profiling():
+    config.profiling = action_profiling.isChecked()
+    profiler.enabled = config.profiling
+
+
 menu = mw.form.menuTools.addMenu("No Scheduler - Review Order by Long-term Knowledge Gain")
 
 action_reorder_cards = QAction("Order cards by knowledge gain", mw, checkable=True)
@@ -32,9 +70,32 @@ action_display_status.triggered.connect(
     lambda: setattr(config, "display_status", action_display_status.isChecked())
 )
 
+
+action_exam_date = QAction("Set exam date...", mw)
+action_exam_date.triggered.connect(set_exam_date)
+
+action_profiling = QAction("Collect profiling statistics", mw, checkable=True)
+action_profiling.setChecked(config.profiling)
+action_profiling.triggered.connect(toggle_profiling)
+
+action_show_profiling = QAction("Show profiling statistics", mw)
+action_show_profiling.triggered.connect(show_profiling_statistics)
+
+action_save_profiling = QAction("Save profiling statistics as JSON", mw)
+action_save_profiling.triggered.connect(save_profiling_statistics)
+
+action_reset_profiling = QAction("Reset profiling statistics", mw)
+action_reset_profiling.triggered.connect(reset_profiling_statistics)
+
 menu.addAction(action_reorder_cards)
 menu.addAction(action_disable_same_day_reviews)
 menu.addAction(action_display_status)
+menu.addAction(action_exam_date)
+menu.addSeparator()
+menu.addAction(action_profiling)
+menu.addAction(action_show_profiling)
+menu.addAction(action_save_profiling)
+menu.addAction(action_reset_profiling)
 
 init_reordering()
 init_ui_review_hook()
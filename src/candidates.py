@@ -0,0 +1,141 @@
+import json
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+
+from anki import cards_pb2
+from anki.stats import QUEUE_TYPE_REV
+from anki.utils import ids2str
+from aqt import mw
+
+from .fsrs.types import State, StateBatch
+
+BackendCard = cards_pb2.Card
+
+# Number of cards read from the collection per query
+PAGE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ReviewCandidate:
+    """
+    A due review card, with only the fields needed to rank it.
+    The memory states of a page of candidates are kept together in one StateBatch, NaN for cards
+    without one, rather than as a State object per card.
+    """
+
+    __slots__ = ("id", "deck_id", "due", "interval", "states", "index")
+
+    id: int
+    # Home deck, whose preset holds the FSRS parameters
+    deck_id: int
+    # Due day in the home deck
+    due: int
+    interval: int
+    # Memory states of the page, and the row of this card
+    states: StateBatch
+    index: int
+
+    @property
+    def has_state(self) -> bool:
+        return not math.isnan(self.states.stabilities[self.index])
+
+    @property
+    def difficulty(self) -> float:
+        return self.states.difficulties[self.index]
+
+    @property
+    def stability(self) -> float:
+        return self.states.stabilities[self.index]
+
+    @property
+    def state(self) -> Optional[State]:
+        return self.states[self.index] if self.has_state else None
+
+    @classmethod
+    def from_backend_cards(cls, cards: Sequence[BackendCard]) -> list["ReviewCandidate"]:
+        return _candidate_page(
+            [
+                (
+                    card.id,
+                    card.original_deck_id or card.deck_id,
+                    card.original_due if card.original_deck_id else card.due,
+                    card.interval,
+                    (
+                        State(
+                            float(card.memory_state.difficulty),
+                            float(card.memory_state.stability),
+                        )
+                        if card.HasField("memory_state")
+                        else None
+                    ),
+                )
+                for card in cards
+            ]
+        )
+
+
+def _candidate_page(
+    rows: Sequence[tuple[int, int, int, int, Optional[State]]],
+) -> list[ReviewCandidate]:
+    """Candidates from (id, deck id, due, interval, memory state) rows, sharing one StateBatch."""
+    difficulties, stabilities = array("d"), array("d")
+    for *_, state in rows:
+        difficulties.append(math.nan if state is None else state.difficulty)
+        stabilities.append(math.nan if state is None else state.stability)
+    states = StateBatch(difficulties, stabilities)
+
+    return [
+        ReviewCandidate(cid, did, due, ivl, states, i)
+        for i, (cid, did, due, ivl, _) in enumerate(rows)
+    ]
+
+
+def _parse_memory_state(data: str) -> Optional[State]:
+    """Read the FSRS memory state from the `data` column of a card."""
+    try:
+        fields = json.loads(data) if data else {}
+    except ValueError:
+        return None
+
+    if "d" not in fields or "s" not in fields:
+        return None
+
+    return State(float(fields["d"]), float(fields["s"]))
+
+
+def iter_review_candidates(
+    deck_ids: Sequence[int], page_size: int = PAGE_SIZE
+) -> Iterator[list[ReviewCandidate]]:
+    """
+    Yield the review-queue cards of `deck_ids` that are due today, one page at a time.
+    Pages are read in card id order and each query resumes after the last id of the previous
+    page, so the work per query stays bounded however large the collection is.
+    Cards in filtered decks are not covered, as their due column holds a queue position.
+    """
+    today = mw.col.sched.today
+    last_id = 0
+
+    while True:
+        rows = mw.col.db.all(
+            f"""
+        SELECT id, did, due, ivl, data FROM cards
+        WHERE id > ? AND queue = {QUEUE_TYPE_REV} AND due <= ? AND did IN {ids2str(deck_ids)}
+        ORDER BY id
+        LIMIT ?
+        """,
+            last_id,
+            today,
+            page_size,
+        )
+        if not rows:
+            return
+
+        yield _candidate_page(
+            [(cid, did, due, ivl, _parse_memory_state(data)) for cid, did, due, ivl, data in rows]
+        )
+
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1][0]
@@ -36,6 +36,33 @@ class Config(object):
         self.data["display_status"] = value
         self.save()
 
+    @property
+    def profiling(self):
+        return self.data.get("profiling", False)
+
+    @profiling.setter
+    def profiling(self, value):
+        self.data["profiling"] = value
+        self.save()
+
+    @property
+    def parallel_scoring(self):
+        return self.data.get("parallel_scoring", False)
+
+    @parallel_scoring.setter
+    def parallel_scoring(self, value):
+        self.data["parallel_scoring"] = value
+        self.save()
+
+    @property
+    def exam_date(self):
+        return self.data.get("exam_date")
+
+    @exam_date.setter
+    def exam_date(self, value):
+        self.data["exam_date"] = value
+        self.save()
+
     def save(self):
         mw.addonManager.writeConfig(addon_identifier, self.data)
 
@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
-from functools import cache
-from typing import Optional, Type, TypeVar
+from typing import Optional, Sequence, Type, TypeVar
 
-from .types import State
+from .cache import FROM_TUPLE_CACHE_SIZE, lru_cached
+from .types import SimulationBatch, State
 
 T = TypeVar("T", bound="FSRS")
 
@@ -13,6 +13,8 @@ class FSRS(ABC):
 
     def __init__(self, params: tuple[float, ...]):
         self._params = params
+        # Instances are cache keys of every simulate call, so hash the parameters only once
+        self._hash = hash((self.VERSION, params))
 
     @property
     def params(self) -> tuple[float, ...]:
@@ -42,10 +44,10 @@ class FSRS(ABC):
         return self.VERSION == other.VERSION and self._params == other._params
 
     def __hash__(self) -> int:
-        return hash((self.VERSION, self._params))
+        return self._hash
 
     @classmethod
-    @cache
+    @lru_cached("from_tuple", FROM_TUPLE_CACHE_SIZE)
     def from_tuple(cls: Type[T], params: tuple[float, ...]) -> T:
         if len(params) != cls.EXPECTED_LENGTH:
             raise ValueError(
@@ -63,3 +65,19 @@ class FSRS(ABC):
         self, state: State, t_review: float, retention: Optional[float] = None
     ) -> list[tuple[float, State]]:
         pass
+
+    @abstractmethod
+    def simulate_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        t_reviews: Sequence[float],
+    ) -> SimulationBatch:
+        pass
+
+    @staticmethod
+    def _check_batch_lengths(*columns: Sequence[float]) -> int:
+        n = len(columns[0])
+        if any(len(column) != n for column in columns):
+            raise ValueError("Batch columns must have the same length")
+        return n
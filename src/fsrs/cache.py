@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Hashable, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Capacities of the caches shared by all FSRS versions
+FROM_TUPLE_CACHE_SIZE = 64
+SIMULATE_CACHE_SIZE = 1 << 16
+
+
+class LRUCache:
+    """
+    A bounded least-recently-used cache that keeps hit, miss and eviction counts.
+    A maxsize of 0 disables caching. Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+
+_caches: dict[str, LRUCache] = {}
+_KWARGS_MARK = object()
+_MISSING = object()
+
+
+def lru_cached(name: str, maxsize: int) -> Callable[[F], F]:
+    """
+    Memoize a function in a bounded LRU cache registered under `name`.
+    Registered caches can be inspected with `cache_stats` and emptied with `clear_caches`.
+    """
+
+    def decorator(func: F) -> F:
+        cache = _caches.setdefault(name, LRUCache(maxsize))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items())) if kwargs else args
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def clear_caches() -> None:
+    """Empty every registered cache, e.g. after the FSRS parameters of a deck change."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
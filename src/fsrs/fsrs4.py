@@ -1,9 +1,15 @@
 import math
-from functools import cache
-from typing import Optional
+from array import array
+from typing import Sequence
+
+try:
+    from ..profiling import count
+except ImportError:
+    from profiling import count
 
 from . import FSRS
-from .types import State
+from .cache import SIMULATE_CACHE_SIZE, lru_cached
+from .types import SimulationBatch, State, accepts_state_batch
 
 D_MIN, D_MAX = 1, 10
 S_MIN, S_MAX = 0.01, 36500
@@ -39,13 +45,14 @@ class FSRS4(FSRS):
         interval = state.stability * alpha
         return interval
 
-    @cache
+    @lru_cached("simulate", SIMULATE_CACHE_SIZE)
     def simulate(
         self,
         state: State,
         t_review: float,
         # retention: Optional[float] = None,
     ) -> list[tuple[float, State]]:
+        count("simulate.calls")
         w = self.params
         D, S = state.difficulty, state.stability
         R = self.power_forgetting_curve(t_review, S)
@@ -82,3 +89,59 @@ class FSRS4(FSRS):
             res.append((prob, State(new_difficulty, new_stability)))
 
         return res
+
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def simulate_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        t_reviews: Sequence[float],
+    ) -> SimulationBatch:
+        """
+        Batch version of `simulate`, returning arrays instead of a list of states per card.
+        """
+        n = self._check_batch_lengths(difficulties, stabilities, t_reviews)
+        count("simulate_batch.cards", n)
+        w = self.params
+        exp = math.exp
+
+        # Terms that only depend on the parameters and the rating
+        mean_reversion = w[7] * w[4]
+        again_delta_difficulty = w[6] * (1 - 3)
+        exp_w8 = exp(w[8])
+
+        probs_again = array("d", bytes(8 * n))
+        difficulties_again = array("d", bytes(8 * n))
+        stabilities_again = array("d", bytes(8 * n))
+        probs_good = array("d", bytes(8 * n))
+        difficulties_good = array("d", bytes(8 * n))
+        stabilities_good = array("d", bytes(8 * n))
+
+        for i, (D, S, t_review) in enumerate(zip(difficulties, stabilities, t_reviews)):
+            R = (1 + FACTOR * t_review / S) ** DECAY if S > 0 else 0.0
+
+            difficulty_again = mean_reversion + (1 - w[7]) * (D - again_delta_difficulty)
+            difficulty_good = mean_reversion + (1 - w[7]) * D
+
+            stability_again = (
+                w[11] * (D ** -w[12]) * ((S + 1) ** w[13] - 1) * exp(w[14] * (1 - R))
+            )
+            stability_good = S * (
+                exp_w8 * (11 - D) * S ** (-w[9]) * (exp(w[10] * (1 - R)) - 1) + 1
+            )
+
+            probs_again[i] = 1 - R
+            difficulties_again[i] = min(D_MAX, max(D_MIN, difficulty_again))
+            stabilities_again[i] = min(S_MAX, max(S_MIN, stability_again))
+            probs_good[i] = R
+            difficulties_good[i] = min(D_MAX, max(D_MIN, difficulty_good))
+            stabilities_good[i] = min(S_MAX, max(S_MIN, stability_good))
+
+        return SimulationBatch(
+            probs_again,
+            difficulties_again,
+            stabilities_again,
+            probs_good,
+            difficulties_good,
+            stabilities_good,
+        )
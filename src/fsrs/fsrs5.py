@@ -1,8 +1,8 @@
-from typing import Optional
+from typing import Optional, Sequence
 
 from . import FSRS
 from .fsrs6 import FSRS6
-from .types import State
+from .types import SimulationBatch, State, accepts_state_batch
 
 D_MIN, D_MAX = 1, 10
 S_MIN, S_MAX = 0.01, 36500
@@ -43,4 +43,13 @@ class FSRS5(FSRS):
         t_review: float,
         retention: Optional[float] = None,
     ) -> list[tuple[float, State]]:
-        return self._fsrs6.simulate(state, t_review, retention)
+        return self._fsrs6.simulate(state, t_review)
+
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def simulate_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        t_reviews: Sequence[float],
+    ) -> SimulationBatch:
+        return self._fsrs6.simulate_batch(difficulties, stabilities, t_reviews)
@@ -1,7 +1,15 @@
 import math
+from array import array
+from typing import Sequence
+
+try:
+    from ..profiling import count
+except ImportError:
+    from profiling import count
 
 from . import FSRS
-from .types import State
+from .cache import SIMULATE_CACHE_SIZE, lru_cached
+from .types import SimulationBatch, State, accepts_state_batch
 
 D_MIN, D_MAX = 1, 10
 S_MIN, S_MAX = 0.01, 36500
@@ -36,11 +44,13 @@ class FSRS6(FSRS):
 
         return interval
 
+    @lru_cached("simulate", SIMULATE_CACHE_SIZE)
     def simulate(
         self,
         state: State,
         t_review: float,
     ) -> list[tuple[float, State]]:
+        count("simulate.calls")
         w = self.params
         D, S = state.difficulty, state.stability
         R = self.power_forgetting_curve(t_review, S)
@@ -82,6 +92,71 @@ class FSRS6(FSRS):
 
         return res
 
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def simulate_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        t_reviews: Sequence[float],
+    ) -> SimulationBatch:
+        """
+        Batch version of `simulate`, returning arrays instead of a list of states per card.
+        """
+        n = self._check_batch_lengths(difficulties, stabilities, t_reviews)
+        count("simulate_batch.cards", n)
+        w = self.params
+        exp = math.exp
+        decay, factor = self._decay, self._factor
+
+        # Terms that only depend on the parameters and the rating
+        again_mean_reversion = w[7] * self._D04
+        again_delta_difficulty = -w[6] * (1 - 3)
+        short_term_again = exp(w[17] * (1 - 3 + w[18]))
+        short_term_good = exp(w[17] * (3 - 3 + w[18]))
+        exp_w8 = exp(w[8])
+
+        probs_again = array("d", bytes(8 * n))
+        difficulties_again = array("d", bytes(8 * n))
+        stabilities_again = array("d", bytes(8 * n))
+        probs_good = array("d", bytes(8 * n))
+        difficulties_good = array("d", bytes(8 * n))
+        stabilities_good = array("d", bytes(8 * n))
+
+        for i, (D, S, t_review) in enumerate(zip(difficulties, stabilities, t_reviews)):
+            R = (1 + factor * t_review / S) ** decay if S > 0 else 0.0
+
+            difficulty_again = again_mean_reversion + (1 - w[7]) * (
+                D + again_delta_difficulty * (10 - D) / 9
+            )
+            difficulty_good = again_mean_reversion + (1 - w[7]) * D
+
+            if t_review < 1:
+                stability_again = S * short_term_again * S ** (-w[19])
+                stability_good = S * short_term_good * S ** (-w[19])
+            else:
+                stability_again = (
+                    w[11] * (D ** -w[12]) * ((S + 1) ** w[13] - 1) * exp(w[14] * (1 - R))
+                )
+                stability_good = S * (
+                    exp_w8 * (11 - D) * S ** (-w[9]) * (exp(w[10] * (1 - R)) - 1) + 1
+                )
+
+            probs_again[i] = 1 - R
+            difficulties_again[i] = min(D_MAX, max(D_MIN, difficulty_again))
+            stabilities_again[i] = min(S_MAX, max(S_MIN, stability_again))
+            probs_good[i] = R
+            difficulties_good[i] = min(D_MAX, max(D_MIN, difficulty_good))
+            stabilities_good[i] = min(S_MAX, max(S_MIN, stability_good))
+
+        return SimulationBatch(
+            probs_again,
+            difficulties_again,
+            stabilities_again,
+            probs_good,
+            difficulties_good,
+            stabilities_good,
+        )
+
     # def simulate(
     #     self,
     #     state: State,
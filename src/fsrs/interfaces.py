@@ -1,6 +1,6 @@
-from typing import Optional, Protocol, Type, TypeVar
+from typing import Optional, Protocol, Sequence, Type, TypeVar
 
-from .types import State
+from .types import SimulationBatch, State
 
 T = TypeVar("T", bound="FSRSProtocol")
 
@@ -22,4 +22,11 @@ class FSRSProtocol(Protocol):
         retention: Optional[float] = None,
     ) -> list[tuple[float, State]]: ...
 
+    def simulate_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        t_reviews: Sequence[float],
+    ) -> SimulationBatch: ...
+
     def power_forgetting_curve(self, t: float, s: float) -> float: ...
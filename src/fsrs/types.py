@@ -1,12 +1,142 @@
+from array import array
 from dataclasses import dataclass
-from typing import Optional, Protocol
+from functools import wraps
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol, Sequence, TypeVar, Union
+
+F = TypeVar("F", bound=Callable[..., Any])
 
 
 @dataclass(frozen=True)
 class State:
+    # Written out rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ("difficulty", "stability")
+
     difficulty: float
     stability: float
 
+    # Frozen slotted dataclasses cannot be unpickled with the default setattr-based protocol
+    def __getstate__(self) -> tuple[float, float]:
+        return (self.difficulty, self.stability)
+
+    def __setstate__(self, state: tuple[float, float]) -> None:
+        object.__setattr__(self, "difficulty", state[0])
+        object.__setattr__(self, "stability", state[1])
+
+
+def _column(values: Union[Sequence[float], memoryview]) -> memoryview:
+    """A read-write view of doubles over `values`, copied only if not already doubles."""
+    if isinstance(values, memoryview) and values.format == "d":
+        return values
+    if isinstance(values, array) and values.typecode == "d":
+        return memoryview(values)
+    return memoryview(array("d", values))
+
+
+class StateBatch:
+    """
+    Memory states of many cards as parallel columns of doubles, 16 bytes per state, or 24 with
+    elapsed days. Columns are memoryviews, so slicing a batch shares its memory instead of
+    copying it, and they can be passed to any batch method as sequences of floats.
+    """
+
+    __slots__ = ("difficulties", "stabilities", "elapsed_days")
+
+    def __init__(
+        self,
+        difficulties: Union[Sequence[float], memoryview],
+        stabilities: Union[Sequence[float], memoryview],
+        elapsed_days: Optional[Union[Sequence[float], memoryview]] = None,
+    ):
+        self.difficulties = _column(difficulties)
+        self.stabilities = _column(stabilities)
+        self.elapsed_days = None if elapsed_days is None else _column(elapsed_days)
+
+        n = len(self.difficulties)
+        if len(self.stabilities) != n or (
+            self.elapsed_days is not None and len(self.elapsed_days) != n
+        ):
+            raise ValueError("Batch columns must have the same length")
+
+    @classmethod
+    def from_states(
+        cls, states: Iterable[State], elapsed_days: Optional[Sequence[float]] = None
+    ) -> "StateBatch":
+        difficulties, stabilities = array("d"), array("d")
+        for state in states:
+            difficulties.append(state.difficulty)
+            stabilities.append(state.stability)
+        return cls(difficulties, stabilities, elapsed_days)
+
+    def to_states(self) -> list[State]:
+        return [State(d, s) for d, s in zip(self.difficulties, self.stabilities)]
+
+    def columns(self, *names: str) -> tuple[memoryview, ...]:
+        """The columns called `names`, e.g. ("stabilities", "elapsed_days")."""
+        if "elapsed_days" in names and self.elapsed_days is None:
+            raise ValueError("The batch has no elapsed days")
+        return tuple(getattr(self, name) for name in names)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self) -> list[memoryview]:
+        columns = [self.difficulties, self.stabilities]
+        if self.elapsed_days is not None:
+            columns.append(self.elapsed_days)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.difficulties)
+
+    def __iter__(self) -> Iterator[State]:
+        return map(State, self.difficulties, self.stabilities)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return StateBatch(*(column[index] for column in self._columns()))
+        return State(self.difficulties[index], self.stabilities[index])
+
+    def __repr__(self) -> str:
+        elapsed = "" if self.elapsed_days is None else " with elapsed days"
+        return f"<StateBatch of {len(self)} states{elapsed}>"
+
+
+def accepts_state_batch(*names: str) -> Callable[[F], F]:
+    """
+    Let a batch method take a StateBatch in place of its leading columns, which are the
+    StateBatch columns called `names`. Columns the batch does not hold, i.e. elapsed days, are
+    then passed after it as usual.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if args and isinstance(args[0], StateBatch):
+                batch = args[0]
+                held = [name for name in names if getattr(batch, name) is not None]
+                args = batch.columns(*held) + args[1:]
+            return func(self, *args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@dataclass(frozen=True)
+class SimulationBatch:
+    """Outcomes of reviewing a batch of memory states, as arrays parallel to the inputs."""
+
+    probs_again: array
+    difficulties_again: array
+    stabilities_again: array
+    probs_good: array
+    difficulties_good: array
+    stabilities_good: array
+
+    def __len__(self) -> int:
+        return len(self.probs_good)
+
 
 class FSRSProtocol(Protocol):
     def simulate(
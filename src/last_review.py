@@ -0,0 +1,23 @@
+from typing import Optional
+
+from aqt import mw
+
+from .last_review_index import LastReviewIndex
+from .storage import get_storage, storage_lock
+
+_index: Optional[LastReviewIndex] = None
+
+
+def get_last_review_index() -> LastReviewIndex:
+    """
+    Return the last review index of the current profile and collection, stored in the sidecar
+    database and sharing its lock.
+    """
+    global _index
+
+    with storage_lock:
+        db = get_storage()
+        if _index is None or _index.db is not db or _index.revlog is not mw.col.db:
+            _index = LastReviewIndex(db, mw.col.db, storage_lock)
+
+        return _index
@@ -0,0 +1,121 @@
+import sqlite3
+from threading import RLock
+from typing import Any, Optional
+
+# Revlog type of cram entries, anki.stats.REVLOG_CRAM
+REVLOG_CRAM = 3
+
+# Qualifying reviews: a button was pressed, and cram entries have a factor
+REVLOG_FILTER = f"ease >= 1 AND (type != {REVLOG_CRAM} OR factor != 0)"
+
+
+class LastReviewIndex:
+    """
+    Persistent map from card id to the Unix timestamp (seconds) of its last qualifying review.
+
+    `db` is the sqlite connection the index is stored in, and `revlog` the collection's database,
+    queried through its `first`, `scalar` and `all` methods. The index remembers the largest
+    revlog id and the revlog size it has seen. New revlog entries are folded in incrementally;
+    if entries were removed or inserted below that id, as after an undo or a sync, the index is
+    rebuilt from scratch.
+    """
+
+    def __init__(self, db: sqlite3.Connection, revlog: Any, lock: Optional[RLock] = None):
+        self.db = db
+        self.revlog = revlog
+        # Rankings are built on a background thread while the reviewer runs quick checks, and
+        # other stores may share the connection
+        self._lock = lock or RLock()
+        with self._lock:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS last_review "
+                "(cid INTEGER PRIMARY KEY, timestamp INTEGER NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS last_review_meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+            self.timestamps: dict[int, int] = dict(
+                db.execute("SELECT cid, timestamp FROM last_review")
+            )
+            meta = dict(db.execute("SELECT key, value FROM last_review_meta"))
+            self.revlog_max_id: Optional[int] = meta.get("revlog_max_id")
+            self.revlog_count: Optional[int] = meta.get("revlog_count")
+
+    def check(self, full: bool = True) -> None:
+        """
+        Bring the index up to date with the revlog.
+        A quick check only looks at the largest revlog id; a full check also compares the
+        revlog size, which catches entries synced in below the largest id.
+        """
+        with self._lock:
+            self._check(full)
+
+    def _check(self, full: bool) -> None:
+        if full:
+            max_id, count = self.revlog.first("SELECT COALESCE(MAX(id), 0), COUNT() FROM revlog")
+        else:
+            max_id, count = self.revlog.scalar("SELECT COALESCE(MAX(id), 0) FROM revlog"), None
+
+        if self.revlog_max_id is None or self.revlog_count is None or max_id < self.revlog_max_id:
+            self._rebuild()
+            return
+
+        if max_id == self.revlog_max_id and count in (None, self.revlog_count):
+            return
+
+        new_count = self.revlog.scalar(
+            "SELECT COUNT() FROM revlog WHERE id > ?", self.revlog_max_id
+        )
+        if count is not None and count != self.revlog_count + new_count:
+            self._rebuild()
+            return
+
+        rows = self.revlog.all(
+            f"""
+        SELECT cid, MAX(id) / 1000 FROM revlog
+        WHERE id > ? AND {REVLOG_FILTER}
+        GROUP BY cid
+        """,
+            self.revlog_max_id,
+        )
+        self.timestamps.update(rows)
+        self._save(rows, max_id, self.revlog_count + new_count, replace=False)
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        max_id, count = self.revlog.first("SELECT COALESCE(MAX(id), 0), COUNT() FROM revlog")
+        rows = self.revlog.all(
+            f"""
+        SELECT cid, MAX(id) / 1000 FROM revlog
+        WHERE {REVLOG_FILTER}
+        GROUP BY cid
+        """
+        )
+        self.timestamps = dict(rows)
+        self._save(rows, max_id, count, replace=True)
+
+    def _save(self, rows: list, max_id: int, count: int, replace: bool) -> None:
+        self.revlog_max_id, self.revlog_count = max_id, count
+        with self.db:
+            if replace:
+                self.db.execute("DELETE FROM last_review")
+            self.db.executemany("INSERT OR REPLACE INTO last_review VALUES (?, ?)", rows)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO last_review_meta VALUES (?, ?)",
+                [("revlog_max_id", max_id), ("revlog_count", count)],
+            )
+
+    def record_answer(self) -> None:
+        """
+        Fold in the answer just given. The answer goes through a quick check, so that the
+        revlog watermark moves with it and an undo, which removes the entry, is noticed.
+        """
+        self.check(full=False)
+
+    def get(self, card_id: int) -> Optional[int]:
+        with self._lock:
+            return self.timestamps.get(card_id)
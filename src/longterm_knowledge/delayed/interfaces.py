@@ -1,24 +1,36 @@
-from typing import Protocol, Type, TypeVar
+from array import array
+from typing import Protocol, Sequence, Type, TypeVar
 
 try:
+    from ...fsrs.cache import FROM_TUPLE_CACHE_SIZE, lru_cached
+    from ...fsrs.fsrs6 import S_MAX
     from ...fsrs.interfaces import FSRSProtocol
-    from ...fsrs.types import State
+    from ...fsrs.types import SimulationBatch, State, accepts_state_batch
 except ImportError:
+    from fsrs.cache import FROM_TUPLE_CACHE_SIZE, lru_cached
+    from fsrs.fsrs6 import S_MAX
     from fsrs.interfaces import FSRSProtocol
-    from fsrs.types import State
+    from fsrs.types import SimulationBatch, State, accepts_state_batch
 
+from ..discounted import BOUND_TOL
 from . import MAX_DEPTH
 
 T = TypeVar("T", bound="KnowledgeDelayedProtocol")
 
 
 class KnowledgeDelayedProtocol(FSRSProtocol, Protocol):
-    due: float
+    _due: float
+    _horizon: float
+    _max_knowledges: dict[float, float]
 
+    @property
+    def due(self) -> float: ...
     @classmethod
     def from_tuple_with_due(cls: Type[T], params: tuple[float, ...], due: float) -> T: ...
     @classmethod
     def from_list_with_due(cls: Type[T], params: list[float], due: float) -> T: ...
+    @classmethod
+    def _register(cls: Type[T], params: tuple[float, ...], due: float) -> T: ...
     def calc_knowledge(
         self,
         state: State,
@@ -35,15 +47,75 @@ class KnowledgeDelayedProtocol(FSRSProtocol, Protocol):
         elapsed_days: float,
         today: float,
     ) -> float: ...
+    def calc_knowledge_batch(
+        self,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array: ...
+    def _knowledge_gains_from_simulation(
+        self,
+        simulation: SimulationBatch,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array: ...
+    def exp_knowledge_gain_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array: ...
+    def exp_knowledge_gain_future_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array: ...
+    def exp_knowledge_gain_bound_batch(
+        self,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array: ...
 
 
 class KnowledgeDelayedMixin:
-    due: float
+    """
+    Knowledge at a due date, e.g. an exam. Instances are registered by (class, params, due),
+    so models of several due dates coexist and each keeps its own per-due constants.
+    Equality and hashing ignore the due date, as simulations do not depend on it.
+    """
+
+    _due: float
+    # End of the due date; knowledge is measured `horizon - today` days after a review
+    _horizon: float
+    # Knowledge at the due date of a review on a day with the maximum stability, by day
+    _max_knowledges: dict[float, float]
+
+    @property
+    def due(self) -> float:
+        return self._due
 
     @classmethod
     def from_tuple_with_due(cls: Type[T], params: tuple[float, ...], due: float) -> T:
-        inst = cls.from_tuple(params)
-        inst.due = due
+        # The registry is keyed by its positional arguments, so they are normalized here
+        return cls._register(tuple(params), float(due))
+
+    @classmethod
+    @lru_cached("from_tuple_with_due", FROM_TUPLE_CACHE_SIZE)
+    def _register(cls: Type[T], params: tuple[float, ...], due: float) -> T:
+        if len(params) != cls.EXPECTED_LENGTH:
+            raise ValueError(
+                f"{cls.__name__} expects {cls.EXPECTED_LENGTH} parameters, got {len(params)}."
+            )
+
+        inst = cls(params)
+        inst._due = due
+        inst._horizon = due + 1
+        inst._max_knowledges = {}
         return inst
 
     @classmethod
@@ -58,7 +130,7 @@ class KnowledgeDelayedMixin:
     ) -> float:
         if today > self.due:
             raise ValueError("Due date must be in the future")
-        return self.power_forgetting_curve(elapsed_days + self.due - today + 1, state.stability)
+        return self.power_forgetting_curve(elapsed_days + self._horizon - today, state.stability)
 
     def _calc_reviewed_knowledge(
         self: KnowledgeDelayedProtocol, state: State, elapsed_days: float, today: float
@@ -124,3 +196,190 @@ class KnowledgeDelayedMixin:
                     result += prob * next_prob * kg_avg
 
         return result
+
+    @accepts_state_batch("stabilities", "elapsed_days")
+    def calc_knowledge_batch(
+        self: KnowledgeDelayedProtocol,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array:
+        """Batch version of `calc_knowledge`."""
+        due, horizon, decay, factor = self._due, self._horizon, self.decay, self.factor
+
+        out = array("d", bytes(8 * len(stabilities)))
+        for i, (stability, elapsed, today) in enumerate(zip(stabilities, elapsed_days, todays)):
+            if today > due:
+                raise ValueError("Due date must be in the future")
+            if stability > 0:
+                out[i] = (1 + factor * (elapsed + horizon - today) / stability) ** decay
+
+        return out
+
+    def _knowledge_gains_from_simulation(
+        self: KnowledgeDelayedProtocol,
+        simulation: SimulationBatch,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array:
+        """`exp_knowledge_gain` of every card, given the simulated outcomes of its review."""
+        n = len(stabilities)
+        current_knowledges = self.calc_knowledge_batch(stabilities, elapsed_days, todays)
+        reviewed_knowledges = self.calc_knowledge_batch(
+            simulation.stabilities_again + simulation.stabilities_good,
+            [0.0] * (2 * n),
+            list(todays) * 2,
+        )
+
+        return array(
+            "d",
+            [
+                simulation.probs_again[i] * reviewed_knowledges[i]
+                + simulation.probs_good[i] * reviewed_knowledges[n + i]
+                - current_knowledges[i]
+                for i in range(n)
+            ],
+        )
+
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def exp_knowledge_gain_batch(
+        self: KnowledgeDelayedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array:
+        """Batch version of `exp_knowledge_gain`."""
+        simulation = self.simulate_batch(difficulties, stabilities, elapsed_days)
+        return self._knowledge_gains_from_simulation(
+            simulation, stabilities, elapsed_days, todays
+        )
+
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def exp_knowledge_gain_future_batch(
+        self: KnowledgeDelayedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array:
+        """
+        Batch version of `exp_knowledge_gain_future`.
+        The review trees of all cards are expanded one level at a time, so each level costs one
+        simulate_batch call. Subtrees whose next review would fall after the due date are never
+        expanded, and the outcomes simulated to score a child are reused when it is expanded.
+        """
+        n = len(difficulties)
+        if len(stabilities) != n or len(elapsed_days) != n or len(todays) != n:
+            raise ValueError(
+                "difficulties, stabilities, elapsed_days and todays must have the same length"
+            )
+
+        simulation = self.simulate_batch(difficulties, stabilities, elapsed_days)
+        gains = self._knowledge_gains_from_simulation(
+            simulation, stabilities, elapsed_days, todays
+        )
+        if MAX_DEPTH == 0:
+            return gains
+
+        due = self.due
+        out = array("d", gains)
+
+        # Nodes of the current level: card, index of the node's outcomes in `simulation`,
+        # average knowledge gain along the path, and probability of the path
+        cards = [i for i in range(n) if todays[i] + elapsed_days[i] <= due]
+        outcomes = cards[:]
+        averages = [gains[i] for i in cards]
+        probs = [1.0] * len(cards)
+        for card in cards:
+            out[card] = 0.0
+
+        length = 1
+        while cards:
+            # Both outcomes of every node, again first
+            m = len(cards)
+            child_cards = cards * 2
+            child_difficulties = [simulation.difficulties_again[k] for k in outcomes] + [
+                simulation.difficulties_good[k] for k in outcomes
+            ]
+            child_stabilities = [simulation.stabilities_again[k] for k in outcomes] + [
+                simulation.stabilities_good[k] for k in outcomes
+            ]
+            child_probs = [simulation.probs_again[k] for k in outcomes] + [
+                simulation.probs_good[k] for k in outcomes
+            ]
+            child_elapsed_days = [elapsed_days[card] for card in child_cards]
+            # HACK: Children are scored on the same day, as in `exp_knowledge_gain_future`
+            child_todays = [todays[card] for card in child_cards]
+
+            child_simulation = self.simulate_batch(
+                child_difficulties, child_stabilities, child_elapsed_days
+            )
+            child_gains = self._knowledge_gains_from_simulation(
+                child_simulation, child_stabilities, child_elapsed_days, child_todays
+            )
+
+            next_cards, next_outcomes, next_averages, next_probs = [], [], [], []
+            for c, card in enumerate(child_cards):
+                average, prob = averages[c % m], probs[c % m]
+                prob *= child_probs[c]
+                if child_gains[c] <= average:
+                    out[card] += prob * average
+                    continue
+
+                next_average = (average * length + child_gains[c]) / (length + 1)
+                next_day = todays[card] + length * elapsed_days[card]
+                if length + 1 < MAX_DEPTH and next_day + elapsed_days[card] <= due:
+                    next_cards.append(card)
+                    next_outcomes.append(c)
+                    next_averages.append(next_average)
+                    next_probs.append(prob)
+                else:
+                    out[card] += prob * next_average
+
+            cards, outcomes, averages, probs = next_cards, next_outcomes, next_averages, next_probs
+            simulation = child_simulation
+            length += 1
+
+        return out
+
+    @accepts_state_batch("stabilities", "elapsed_days")
+    def exp_knowledge_gain_bound_batch(
+        self: KnowledgeDelayedProtocol,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        todays: Sequence[float],
+    ) -> array:
+        """
+        Upper bound of `exp_knowledge_gain_future` for every card.
+        An estimate averages the gains of the reviews along each path of the review tree, and a
+        gain is at most the knowledge of the maximum stability minus the current knowledge.
+        While reviews succeed the stability never drops below the card's, so those paths score
+        at most the card's own gain bound. Paths with a lapse are taken with probability at most
+        MAX_DEPTH - 1 times the card's lapse probability, and score at most the maximum.
+        Reviews less than a day apart can lower the stability, so they get the maximum.
+        """
+        horizon, decay, factor = self._horizon, self.decay, self.factor
+        lapse_levels = max(MAX_DEPTH - 1, 0)
+        max_knowledges = self._max_knowledges
+
+        out = array("d", bytes(8 * len(todays)))
+        for i, (stability, elapsed, today) in enumerate(zip(stabilities, elapsed_days, todays)):
+            max_knowledge = max_knowledges.get(today)
+            if max_knowledge is None:
+                max_knowledge = self.power_forgetting_curve(horizon - today, S_MAX)
+                max_knowledges[today] = max_knowledge
+
+            if elapsed < 1 or stability <= 0:
+                out[i] = max_knowledge + BOUND_TOL
+                continue
+
+            # Reviews clamp the stability to S_MAX
+            stability = min(stability, S_MAX)
+            knowledge = (1 + factor * (elapsed + horizon - today) / stability) ** decay
+            lapse = 1 - (1 + factor * elapsed / stability) ** decay
+            success = max(0.0, 1 - lapse_levels * lapse)
+            out[i] = max_knowledge - success * knowledge + BOUND_TOL
+
+        return out
@@ -1,3 +1,15 @@
 GAMMA = 0.99
 TOL = 1e-8
 MAX_DEPTH = 3
+# Maximum absolute difference between the batch and the scalar knowledge gains
+BATCH_TOL = 1e-9
+# Absolute error bound and grid limits of the calc_knowledge interpolation tables
+TABLE_TOL = 1e-9
+TABLE_MIN_NODES = 256
+TABLE_MAX_NODES = 1 << 14
+TABLE_MAX_ELAPSED_DAYS = 36500
+# Capacity and key resolution of the transposition cache shared by the future estimator
+TRANSPOSITION_CACHE_SIZE = 1 << 16
+TRANSPOSITION_QUANTUM = 1e-10
+# Slack added to knowledge gain upper bounds to absorb kernel and table errors
+BOUND_TOL = 1e-7
@@ -0,0 +1,41 @@
+try:
+    from ...fsrs.cache import LRUCache
+except ImportError:
+    from fsrs.cache import LRUCache
+
+from . import TRANSPOSITION_CACHE_SIZE, TRANSPOSITION_QUANTUM
+
+
+class TranspositionCache:
+    """
+    Expansions of the future estimator shared across cards, keyed on quantized memory states.
+    `simulations` maps (difficulty, stability, elapsed days) to the simulated review outcomes,
+    and `knowledges` maps a stability to the knowledge right after a review.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = TRANSPOSITION_CACHE_SIZE,
+        quantum: float = TRANSPOSITION_QUANTUM,
+    ):
+        self.simulations = LRUCache(maxsize)
+        self.knowledges = LRUCache(maxsize)
+        self._scale = 1.0 / quantum
+
+    def key(self, *values: float) -> tuple[int, ...]:
+        scale = self._scale
+        return tuple(round(value * scale) for value in values)
+
+    def clear(self) -> None:
+        self.simulations.clear()
+        self.knowledges.clear()
+
+    def reset_stats(self) -> None:
+        self.simulations.reset_stats()
+        self.knowledges.reset_stats()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "simulations": self.simulations.stats(),
+            "knowledges": self.knowledges.stats(),
+        }
@@ -1,17 +1,41 @@
-from typing import Protocol
+from array import array
+from typing import Optional, Protocol, Sequence
 
 try:
+    from ...fsrs.fsrs6 import D_MAX, S_MAX
     from ...fsrs.interfaces import FSRSProtocol
-    from ...fsrs.types import State
+    from ...fsrs.types import SimulationBatch, State, accepts_state_batch
+    from ...profiling import count, timer
 except ImportError:
+    from fsrs.fsrs6 import D_MAX, S_MAX
     from fsrs.interfaces import FSRSProtocol
-    from fsrs.types import State
+    from fsrs.types import SimulationBatch, State, accepts_state_batch
+    from profiling import count, timer
 
-from . import GAMMA, MAX_DEPTH, TOL
-from .utils import knowledge_discounted_integral
+from . import BOUND_TOL, GAMMA, MAX_DEPTH, TABLE_TOL, TOL
+from .cache import TranspositionCache
+from .table import KnowledgeTable
+from .utils import (
+    ERFCX_DECAY,
+    knowledge_discounted_integral,
+    knowledge_discounted_integral_batch,
+    knowledge_discounted_integral_erfcx,
+    knowledge_discounted_integral_erfcx_batch,
+)
 
 
 class KnowledgeDiscountedProtocol(FSRSProtocol, Protocol):
+    _knowledge_table: Optional[KnowledgeTable]
+    _transposition_cache: Optional[TranspositionCache]
+
+    @property
+    def transposition_cache(self) -> TranspositionCache: ...
+    def enable_knowledge_table(self, tol: float = TABLE_TOL) -> KnowledgeTable: ...
+    def disable_knowledge_table(self) -> None: ...
+    def _calc_zero_elapsed_knowledge(self, state: State) -> float: ...
+    def _expand(
+        self, state: State, elapsed_days: float
+    ) -> tuple[tuple[float, State, float], ...]: ...
     def calc_knowledge(self, state: State, elapsed_days: float) -> float: ...
     def _calc_reviewed_knowledge(self, state: State, elapsed_days: float) -> float: ...
     def _calc_knowledge_gain(self, state: State, elapsed_days: float) -> float: ...
@@ -27,12 +51,92 @@ class KnowledgeDiscountedProtocol(FSRSProtocol, Protocol):
         future_estimator=False,
         require_non_increasing=False,
     ) -> float: ...
+    def calc_knowledge_batch(
+        self, stabilities: Sequence[float], elapsed_days: Sequence[float]
+    ) -> array: ...
+    def _calc_knowledge_exact_batch(
+        self, stabilities: Sequence[float], elapsed_days: Sequence[float]
+    ) -> array: ...
+    def _expand_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        cached: bool = False,
+    ) -> tuple[SimulationBatch, array]: ...
+    def _calc_reviewed_knowledge_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        cached: bool = False,
+    ) -> array: ...
+    def _calc_knowledge_gain_future_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+    ) -> array: ...
+    def exp_knowledge_gain_batch(
+        self,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        lookahead: int = 0,
+    ) -> array: ...
+    def exp_knowledge_gain_bound(self, state: State, elapsed_days: float) -> float: ...
+    def exp_knowledge_gain_bound_batch(
+        self, stabilities: Sequence[float], elapsed_days: Sequence[float]
+    ) -> array: ...
 
 
 class KnowledgeDiscountedMixin:
+    _knowledge_table: Optional[KnowledgeTable] = None
+    _transposition_cache: Optional[TranspositionCache] = None
+
+    @property
+    def transposition_cache(self) -> TranspositionCache:
+        """Cache of simulated reviews and post-review knowledge shared across cards."""
+        if self._transposition_cache is None:
+            self._transposition_cache = TranspositionCache()
+        return self._transposition_cache
+
+    def enable_knowledge_table(self, tol: float = TABLE_TOL) -> KnowledgeTable:
+        """
+        Answer calc_knowledge from an interpolation table built once for this parameter set.
+        Queries outside the table's grid are still evaluated exactly. Raises a ValueError, and
+        leaves the current table in place, if `tol` cannot be reached.
+        Arguments:
+            tol: Maximum absolute error of the interpolated knowledge.
+        Returns:
+            The table, whose `stats()` report its build time, memory and measured error.
+        """
+        table = self._knowledge_table
+        if table is None or table.tol > tol:
+            table = self._knowledge_table = KnowledgeTable(self.decay, self.factor, tol=tol)
+            self.transposition_cache.clear()
+        return table
+
+    def disable_knowledge_table(self) -> None:
+        if self._knowledge_table is not None:
+            self._knowledge_table = None
+            self.transposition_cache.clear()
+
     def calc_knowledge(
         self: KnowledgeDiscountedProtocol, state: State, elapsed_days: float
     ) -> float:
+        if self._knowledge_table is not None:
+            knowledge = self._knowledge_table(state.stability, elapsed_days)
+            if knowledge is not None:
+                return knowledge
+
+        if self.decay == ERFCX_DECAY:
+            return knowledge_discounted_integral_erfcx(
+                stability=state.stability,
+                factor=self.factor,
+                t_begin=elapsed_days,
+            )
+
         return knowledge_discounted_integral(
             stability=state.stability,
             decay=self.decay,
@@ -41,14 +145,46 @@ class KnowledgeDiscountedMixin:
             tol=TOL,
         )
 
+    def _calc_zero_elapsed_knowledge(
+        self: KnowledgeDiscountedProtocol, state: State
+    ) -> float:
+        """Knowledge right after a review, shared across cards with the same stability."""
+        knowledges = self.transposition_cache.knowledges
+        key = self.transposition_cache.key(state.stability)
+
+        knowledge = knowledges.get(key)
+        if knowledge is None:
+            knowledge = self.calc_knowledge(state, elapsed_days=0)
+            knowledges.put(key, knowledge)
+
+        return knowledge
+
+    def _expand(
+        self: KnowledgeDiscountedProtocol, state: State, elapsed_days: float
+    ) -> tuple[tuple[float, State, float], ...]:
+        """
+        Simulate a review after `elapsed_days`.
+        Returns the probability, next state and knowledge right after the review of each outcome.
+        """
+        simulations = self.transposition_cache.simulations
+        key = self.transposition_cache.key(state.difficulty, state.stability, elapsed_days)
+
+        expansion = simulations.get(key)
+        if expansion is None:
+            expansion = tuple(
+                (prob, next_state, self._calc_zero_elapsed_knowledge(next_state))
+                for prob, next_state in self.simulate(state, elapsed_days)
+            )
+            simulations.put(key, expansion)
+
+        return expansion
+
     def _calc_reviewed_knowledge(
         self: KnowledgeDiscountedProtocol, state: State, elapsed_days: float
     ) -> float:
-        next_states = self.simulate(state, elapsed_days)
-
         knowledge = sum(
-            prob * self.calc_knowledge(next_state, elapsed_days=0)
-            for prob, next_state in next_states
+            prob * next_knowledge
+            for prob, _, next_knowledge in self._expand(state, elapsed_days)
         )
 
         return knowledge
@@ -126,13 +262,8 @@ class KnowledgeDiscountedMixin:
         initial_knowledge = self.calc_knowledge(state, elapsed_days=elapsed_days)
 
         def dfs(state: State, last_knowledge: float, depth: int) -> float:
-            next_states = self.simulate(state, elapsed_days)
-            next_knowledges = [
-                self.calc_knowledge(next_state[1], elapsed_days=0) for next_state in next_states
-            ]
-            expected_knowledge = sum(
-                prob * knowledge for (prob, _), knowledge in zip(next_states, next_knowledges)
-            )
+            expansion = self._expand(state, elapsed_days)
+            expected_knowledge = sum(prob * knowledge for prob, _, knowledge in expansion)
 
             if (
                 depth == 0
@@ -143,9 +274,7 @@ class KnowledgeDiscountedMixin:
                 if depth < MAX_DEPTH:
                     # Do search
                     total = 0.0
-                    for (next_prob, next_state), next_knowledge in zip(
-                        next_states, next_knowledges
-                    ):
+                    for next_prob, next_state, next_knowledge in expansion:
                         total += next_prob * dfs(
                             next_state,
                             next_knowledge,
@@ -295,3 +424,319 @@ class KnowledgeDiscountedMixin:
             return self._calc_knowledge_gain_future(state, elapsed_days=elapsed_days)
 
         return self._calc_knowledge_gain(state, elapsed_days=elapsed_days)
+
+    @accepts_state_batch("stabilities", "elapsed_days")
+    def calc_knowledge_batch(
+        self: KnowledgeDiscountedProtocol,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+    ) -> array:
+        table = self._knowledge_table
+        if table is None:
+            return self._calc_knowledge_exact_batch(stabilities, elapsed_days)
+
+        knowledges, misses = table.batch(stabilities, elapsed_days)
+        if misses:
+            exact_knowledges = self._calc_knowledge_exact_batch(
+                [stabilities[i] for i in misses], [elapsed_days[i] for i in misses]
+            )
+            for i, knowledge in zip(misses, exact_knowledges):
+                knowledges[i] = knowledge
+
+        return knowledges
+
+    def _calc_knowledge_exact_batch(
+        self: KnowledgeDiscountedProtocol,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+    ) -> array:
+        if self.decay == ERFCX_DECAY:
+            return knowledge_discounted_integral_erfcx_batch(
+                stabilities=stabilities,
+                factor=self.factor,
+                t_begin=elapsed_days,
+            )
+
+        return knowledge_discounted_integral_batch(
+            stabilities=stabilities,
+            decay=self.decay,
+            factor=self.factor,
+            t_begin=elapsed_days,
+            tol=TOL,
+        )
+
+    def _expand_batch(
+        self: KnowledgeDiscountedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        cached: bool = False,
+    ) -> tuple[SimulationBatch, array]:
+        """
+        Batch version of `_expand`: the simulated outcomes of each state, and the knowledge right
+        after each outcome, those of the "again" outcomes first. If `cached`, expansions are
+        shared with `_expand` through the transposition cache, and only the states missing from
+        it are simulated.
+        """
+        if not cached:
+            simulation = self.simulate_batch(difficulties, stabilities, elapsed_days)
+            # Evaluate both outcomes in a single kernel call
+            knowledges = self.calc_knowledge_batch(
+                simulation.stabilities_again + simulation.stabilities_good,
+                [0.0] * (2 * len(simulation)),
+            )
+            return simulation, knowledges
+
+        cache = self.transposition_cache
+        keys = [cache.key(*values) for values in zip(difficulties, stabilities, elapsed_days)]
+        expansions = [cache.simulations.get(key) for key in keys]
+
+        misses = [i for i, expansion in enumerate(expansions) if expansion is None]
+        if misses:
+            simulation, knowledges = self._expand_batch(
+                [difficulties[i] for i in misses],
+                [stabilities[i] for i in misses],
+                [elapsed_days[i] for i in misses],
+            )
+            m = len(misses)
+            for j, i in enumerate(misses):
+                expansion = (
+                    (
+                        simulation.probs_again[j],
+                        State(simulation.difficulties_again[j], simulation.stabilities_again[j]),
+                        knowledges[j],
+                    ),
+                    (
+                        simulation.probs_good[j],
+                        State(simulation.difficulties_good[j], simulation.stabilities_good[j]),
+                        knowledges[m + j],
+                    ),
+                )
+                cache.simulations.put(keys[i], expansion)
+                expansions[i] = expansion
+
+        again = [expansion[0] for expansion in expansions]
+        good = [expansion[1] for expansion in expansions]
+        simulation = SimulationBatch(
+            array("d", [prob for prob, _, _ in again]),
+            array("d", [state.difficulty for _, state, _ in again]),
+            array("d", [state.stability for _, state, _ in again]),
+            array("d", [prob for prob, _, _ in good]),
+            array("d", [state.difficulty for _, state, _ in good]),
+            array("d", [state.stability for _, state, _ in good]),
+        )
+        knowledges = array("d", [knowledge for _, _, knowledge in again + good])
+        return simulation, knowledges
+
+    def _calc_reviewed_knowledge_batch(
+        self: KnowledgeDiscountedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        cached: bool = False,
+    ) -> array:
+        simulation, knowledges = self._expand_batch(
+            difficulties, stabilities, elapsed_days, cached=cached
+        )
+        probs_again, probs_good = simulation.probs_again, simulation.probs_good
+        n = len(probs_again)
+        knowledges_again, knowledges_good = knowledges[:n], knowledges[n:]
+
+        return array(
+            "d",
+            [
+                prob_again * knowledge_again + prob_good * knowledge_good
+                for prob_again, knowledge_again, prob_good, knowledge_good in zip(
+                    probs_again, knowledges_again, probs_good, knowledges_good
+                )
+            ],
+        )
+
+    def _calc_knowledge_gain_future_batch(
+        self: KnowledgeDiscountedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+    ) -> array:
+        """
+        Batch version of `_calc_knowledge_gain_future`.
+        The decision tree of every card is expanded one level at a time, so each level costs one
+        simulate_batch and one calc_knowledge_batch call. Nodes where the estimator stops
+        reviewing are not expanded further. The roots go through the transposition cache, where
+        `exp_knowledge_gain_batch` has just put their reviewed knowledge.
+        """
+        if MAX_DEPTH == 0:
+            return self.exp_knowledge_gain_batch(difficulties, stabilities, elapsed_days)
+
+        initial_knowledges = self.calc_knowledge_batch(stabilities, elapsed_days)
+
+        # Nodes of the current level: card index, memory state and knowledge after the last review
+        cards = list(range(len(difficulties)))
+        node_difficulties, node_stabilities = list(difficulties), list(stabilities)
+        last_knowledges = list(initial_knowledges)
+
+        # Value of every node per level, and the parent and probability of every non-root node
+        levels: list[list[float]] = []
+        links: list[tuple[list[int], list[float]]] = []
+
+        for depth in range(MAX_DEPTH + 1):
+            m = len(cards)
+            # Deeper nodes are rarely shared, so they bypass the cache
+            simulation, knowledges = self._expand_batch(
+                node_difficulties,
+                node_stabilities,
+                [elapsed_days[card] for card in cards],
+                cached=depth == 0,
+            )
+
+            values = [0.0] * m
+            children: list[int] = []
+            next_cards, next_probs = [], []
+            next_difficulties, next_stabilities, next_last_knowledges = [], [], []
+
+            for i, card in enumerate(cards):
+                initial_knowledge = initial_knowledges[card]
+                prob_again, prob_good = simulation.probs_again[i], simulation.probs_good[i]
+                knowledge_again, knowledge_good = knowledges[i], knowledges[m + i]
+                expected_knowledge = prob_again * knowledge_again + prob_good * knowledge_good
+
+                if (
+                    depth == 0
+                    or (expected_knowledge - initial_knowledge) / (depth + 1)
+                    > (last_knowledges[i] - initial_knowledge) / depth
+                ):
+                    # Do review
+                    if depth < MAX_DEPTH:
+                        # Expand both outcomes; the value is summed from the children
+                        children += (i, i)
+                        next_cards += (card, card)
+                        next_probs += (prob_again, prob_good)
+                        next_difficulties += (
+                            simulation.difficulties_again[i],
+                            simulation.difficulties_good[i],
+                        )
+                        next_stabilities += (
+                            simulation.stabilities_again[i],
+                            simulation.stabilities_good[i],
+                        )
+                        next_last_knowledges += (knowledge_again, knowledge_good)
+                    else:
+                        values[i] = (expected_knowledge - initial_knowledge) / (depth + 1)
+                else:
+                    # No review
+                    values[i] = (last_knowledges[i] - initial_knowledge) / depth
+
+            levels.append(values)
+            if not next_cards:
+                break
+            links.append((children, next_probs))
+
+            cards = next_cards
+            node_difficulties, node_stabilities = next_difficulties, next_stabilities
+            last_knowledges = next_last_knowledges
+
+        # Sum the values of the expanded nodes from the deepest level up
+        for depth in range(len(levels) - 1, 0, -1):
+            parents, probs = links[depth - 1]
+            parent_values = levels[depth - 1]
+            for parent, prob, value in zip(parents, probs, levels[depth]):
+                parent_values[parent] += prob * value
+
+        return array("d", levels[0])
+
+    @accepts_state_batch("difficulties", "stabilities", "elapsed_days")
+    def exp_knowledge_gain_batch(
+        self: KnowledgeDiscountedProtocol,
+        difficulties: Sequence[float],
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+        lookahead: int = 0,
+    ) -> array:
+        """
+        Calculate the expected knowledge gain for a batch of cards.
+        Arguments:
+            difficulties: Difficulties of the cards.
+            stabilities: Stabilities of the cards.
+            elapsed_days: Elapsed days since the last review of each card.
+            lookahead: Lookahead strategy for future reviews, see `exp_knowledge_gain`.
+        Returns:
+            Expected knowledge gain of each card, within BATCH_TOL of `exp_knowledge_gain`.
+        """
+        n = len(difficulties)
+        if len(stabilities) != n or len(elapsed_days) != n:
+            raise ValueError("difficulties, stabilities and elapsed_days must have the same length")
+        count("exp_knowledge_gain_batch.cards", n)
+
+        # The future estimator expands the same states again, and when the batch spans consecutive
+        # days, the next day's check of one day is the reviewed knowledge of the next
+        cached = lookahead >= 2
+        with timer("exp_knowledge_gain_batch.reviewed"):
+            reviewed_knowledges = self._calc_reviewed_knowledge_batch(
+                difficulties, stabilities, elapsed_days, cached=cached
+            )
+
+        if lookahead >= 1:
+            with timer("exp_knowledge_gain_batch.tomorrow"):
+                tomorrow_reviewed_knowledges = self._calc_reviewed_knowledge_batch(
+                    difficulties,
+                    stabilities,
+                    [elapsed + 1 for elapsed in elapsed_days],
+                    cached=cached,
+                )
+            skip = [
+                reviewed < tomorrow
+                for reviewed, tomorrow in zip(reviewed_knowledges, tomorrow_reviewed_knowledges)
+            ]
+        else:
+            skip = [False] * n
+
+        if lookahead >= 2:
+            gains = array("d", bytes(8 * n))
+            indices = [i for i, skipped in enumerate(skip) if not skipped]
+            with timer("exp_knowledge_gain_batch.future"):
+                future_gains = self._calc_knowledge_gain_future_batch(
+                    [difficulties[i] for i in indices],
+                    [stabilities[i] for i in indices],
+                    [elapsed_days[i] for i in indices],
+                )
+            for i, gain in zip(indices, future_gains):
+                gains[i] = gain
+            return gains
+
+        with timer("exp_knowledge_gain_batch.current"):
+            current_knowledges = self.calc_knowledge_batch(stabilities, elapsed_days)
+
+        return array(
+            "d",
+            [
+                0.0 if skipped else reviewed - current
+                for reviewed, current, skipped in zip(
+                    reviewed_knowledges, current_knowledges, skip
+                )
+            ],
+        )
+
+    def exp_knowledge_gain_bound(
+        self: KnowledgeDiscountedProtocol, state: State, elapsed_days: float
+    ) -> float:
+        """
+        Upper bound of `exp_knowledge_gain` for every lookahead.
+        Every estimate is an average of knowledges right after a review minus the current
+        knowledge, and no review can do better than the maximum stability.
+        """
+        max_knowledge = self._calc_zero_elapsed_knowledge(State(D_MAX, S_MAX))
+        current_knowledge = self.calc_knowledge(state, elapsed_days=elapsed_days)
+
+        return max_knowledge - current_knowledge + BOUND_TOL
+
+    @accepts_state_batch("stabilities", "elapsed_days")
+    def exp_knowledge_gain_bound_batch(
+        self: KnowledgeDiscountedProtocol,
+        stabilities: Sequence[float],
+        elapsed_days: Sequence[float],
+    ) -> array:
+        """Batch version of `exp_knowledge_gain_bound`."""
+        max_knowledge = self._calc_zero_elapsed_knowledge(State(D_MAX, S_MAX))
+        current_knowledges = self.calc_knowledge_batch(stabilities, elapsed_days)
+
+        return array("d", [max_knowledge - current + BOUND_TOL for current in current_knowledges])
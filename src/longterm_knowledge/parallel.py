@@ -0,0 +1,202 @@
+import importlib
+import multiprocessing
+import os
+import site
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional, Sequence
+
+# Batches smaller than this are scored in-process, where they cost less than the process overhead
+PARALLEL_THRESHOLD = 20000
+
+# Number of cards per task sent to a worker
+PARALLEL_CHUNK_SIZE = 4096
+
+# Workers are spawned rather than forked, as the pool is started from a thread of a Qt process
+PARALLEL_START_METHOD = "spawn"
+
+# Folder holding the top-level packages, i.e. the add-on's folder inside Anki
+_SOURCE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Package the add-on is imported under inside Anki, with a trailing dot, or "" in tests
+_PACKAGE_PREFIX = __name__[: -len("longterm_knowledge.parallel")]
+
+# Models of the worker process, by (module, class, params, due)
+_worker_models: dict[tuple, Any] = {}
+
+
+class _ModuleRef:
+    """Pickles as a module imported by its top-level name, without the add-on package."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __reduce__(self):
+        return (importlib.import_module, (self.name,))
+
+
+class _WorkerFunction:
+    """
+    Pickles as a function of this module imported by its top-level name. Pickling the function
+    itself would make workers import the add-on package, whose __init__ needs a running Anki.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __reduce__(self):
+        return (getattr, (_ModuleRef("longterm_knowledge.parallel"), self.name))
+
+
+def _python_executable() -> Optional[str]:
+    """The interpreter workers are spawned with, or None if this process is not run by one."""
+    # Inside packaged Anki builds sys.executable may be the Anki binary itself
+    name = os.path.basename(sys.executable or "").lower()
+    return sys.executable if name.startswith("python") else None
+
+
+def _model_spec(model: Any) -> tuple:
+    """What a worker needs to rebuild `model`, naming its module without the add-on package."""
+    cls = type(model)
+    module = cls.__module__
+    if _PACKAGE_PREFIX and module.startswith(_PACKAGE_PREFIX):
+        module = module[len(_PACKAGE_PREFIX) :]
+    return (module, cls.__name__, model.params, getattr(model, "due", None))
+
+
+def _get_worker_model(spec: tuple) -> Any:
+    model = _worker_models.get(spec)
+    if model is None:
+        module, name, params, due = spec
+        cls = getattr(importlib.import_module(module), name)
+        model = cls.from_tuple(params) if due is None else cls.from_tuple_with_due(params, due)
+        _worker_models[spec] = model
+    return model
+
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to the block created by the parent, which alone is responsible for unlinking it."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+
+    # Before 3.13 attaching registers the block again, with the resource tracker the worker
+    # shares with the parent. The tracker keeps a set, so the block stays registered once.
+    return SharedMemory(name=name)
+
+
+def _run_chunk(
+    spec: tuple,
+    name: str,
+    n: int,
+    n_columns: int,
+    start: int,
+    stop: int,
+    method: str,
+    kwargs: dict,
+) -> None:
+    model = _get_worker_model(spec)
+    shm = _attach(name)
+    values = shm.buf.cast("d")
+    columns: list[memoryview] = []
+    try:
+        columns = [values[j * n + start : j * n + stop] for j in range(n_columns)]
+        out = getattr(model, method)(*columns, **kwargs)
+        values[n_columns * n + start : n_columns * n + stop] = array("d", out)
+    finally:
+        for column in columns:
+            column.release()
+        values.release()
+        shm.close()
+
+
+class ParallelScorer:
+    """
+    Runs a batch method of a model on a process pool, for backlogs too large for one core.
+
+    The input columns and the output are laid out in one shared memory block, so workers read
+    and write their chunk in place. Workers are spawned and import the model's modules by their
+    top-level names, so they never import Anki. Batches below `threshold` are run in-process,
+    as is everything once the pool breaks or if no Python interpreter is available to spawn.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        workers: Optional[int] = None,
+        threshold: int = PARALLEL_THRESHOLD,
+        chunk_size: int = PARALLEL_CHUNK_SIZE,
+        start_method: str = PARALLEL_START_METHOD,
+    ):
+        self.model = model
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self.broken = _python_executable() is None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=site.addsitedir,
+                initargs=(_SOURCE_FOLDER,),
+            )
+        return self._executor
+
+    def map(self, method: str, *columns: Sequence[float], **kwargs: Any) -> array:
+        """
+        Return `getattr(model, method)(*columns, **kwargs)` as an array of floats.
+        `method` must be a batch method mapping parallel columns to one value per element.
+        """
+        n = len(columns[0])
+        if any(len(column) != n for column in columns):
+            raise ValueError("Batch columns must have the same length")
+
+        if n < max(self.threshold, 1) or self.workers <= 1 or self.broken:
+            return array("d", getattr(self.model, method)(*columns, **kwargs))
+
+        try:
+            return self._map_on_pool(method, n, columns, kwargs)
+        except BrokenProcessPool:
+            # A worker died or could not start; score this and later batches in-process
+            self.broken = True
+            self.close()
+            return array("d", getattr(self.model, method)(*columns, **kwargs))
+
+    def _map_on_pool(
+        self, method: str, n: int, columns: Sequence[Sequence[float]], kwargs: dict
+    ) -> array:
+        k = len(columns)
+        spec = _model_spec(self.model)
+        run_chunk = _WorkerFunction("_run_chunk")
+
+        shm = SharedMemory(create=True, size=8 * (k + 1) * n)
+        values = shm.buf.cast("d")
+        try:
+            for j, column in enumerate(columns):
+                values[j * n : (j + 1) * n] = array("d", column)
+
+            executor = self._get_executor()
+            futures = [
+                executor.submit(run_chunk, spec, shm.name, n, k, start, stop, method, kwargs)
+                for start in range(0, n, self.chunk_size)
+                for stop in [min(start + self.chunk_size, n)]
+            ]
+            for future in futures:
+                future.result()
+
+            return array("d", values[k * n : (k + 1) * n].tobytes())
+        finally:
+            values.release()
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,184 @@
+import heapq
+from itertools import count
+from threading import RLock
+from typing import Callable, Generic, Hashable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+TOP_K_CHUNK_SIZE = 256
+
+
+def top_k(
+    items: Sequence[T],
+    k: int,
+    score: Callable[[list[T]], Sequence[float]],
+    bounds: Optional[Sequence[float]] = None,
+    chunk_size: int = TOP_K_CHUNK_SIZE,
+) -> list[tuple[T, float]]:
+    """
+    Select the k items with the highest scores.
+    Arguments:
+        items: Candidates, in the order used to break ties.
+        k: Number of items to keep.
+        score: Scores a chunk of items at once.
+        bounds: Optional upper bounds of the scores, parallel to `items`. Items are then scored in
+            order of decreasing bound, and items whose bound is below the k-th best score so far
+            are never scored.
+        chunk_size: Number of items scored per call of `score`.
+    Returns:
+        (item, score) pairs in the same order as the first k items of
+        sorted(items, key=score, reverse=True).
+    """
+    if k <= 0 or not items:
+        return []
+
+    if bounds is None:
+        order: Sequence[int] = range(len(items))
+    else:
+        if len(bounds) != len(items):
+            raise ValueError("bounds must have the same length as items")
+        order = sorted(range(len(items)), key=bounds.__getitem__, reverse=True)
+
+    # Min-heap of the best (score, -index) pairs; ties go to the earlier item
+    heap: list[tuple[float, int]] = []
+
+    for start in range(0, len(order), chunk_size):
+        chunk = order[start : start + chunk_size]
+
+        if bounds is not None and len(heap) == k:
+            threshold = heap[0][0]
+            if bounds[chunk[0]] < threshold:
+                break
+            chunk = [i for i in chunk if bounds[i] >= threshold]
+
+        for i, value in zip(chunk, score([items[i] for i in chunk])):
+            entry = (value, -i)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    return [(items[-i], value) for value, i in sorted(heap, reverse=True)]
+
+
+class RankedQueue(Generic[T]):
+    """
+    Max-priority queue of items keyed by id, scored lazily.
+
+    Items are pushed with an upper bound of their score. When an unscored item reaches the top, it
+    is scored together with the other unscored items at the top and pushed back with its exact
+    score. Items therefore come out in the order of their exact scores, ties going to the item
+    pushed first, while items that never get near the top are never scored.
+
+    Removal is lazy: removed entries stay in the heap and are skipped once they reach the top.
+
+    Safe to share between threads, so that a background thread can score ahead with `prefetch`
+    while another one serves items. Scoring holds the queue's lock.
+    """
+
+    def __init__(
+        self,
+        score: Callable[[list[T]], Sequence[float]],
+        chunk_size: int = TOP_K_CHUNK_SIZE,
+    ):
+        self._score = score
+        self.chunk_size = chunk_size
+        # Entries are (-value, scored, order, key, item); unscored entries win ties, as their
+        # exact score may still tie with an earlier item
+        self._heap: list[tuple] = []
+        self._entries: dict[Hashable, tuple] = {}
+        self._order = count()
+        self._lock = RLock()
+        self.scored = 0
+
+    def push(self, key: Hashable, item: T, bound: float, scored: bool = False) -> None:
+        """
+        Add an item, or replace the item with the same key.
+        If `scored`, `bound` is the exact score of the item and it is never passed to `score`.
+        """
+        with self._lock:
+            entry = (-bound, scored, next(self._order), key, item)
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+
+    def remove(self, key: Hashable) -> bool:
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+
+            # Drop removed entries once they make up most of the heap
+            if len(self._heap) > 2 * len(self._entries) + self.chunk_size:
+                self._heap = list(self._entries.values())
+                heapq.heapify(self._heap)
+
+            return True
+
+    def _is_live(self, entry: tuple) -> bool:
+        return self._entries.get(entry[3]) is entry
+
+    def _resolve(self) -> Optional[tuple]:
+        """Score unscored entries until the top entry is scored, and return it."""
+        heap = self._heap
+
+        while heap:
+            if not self._is_live(heap[0]):
+                heapq.heappop(heap)
+                continue
+            if heap[0][1]:
+                return heap[0]
+
+            chunk = []
+            while heap and len(chunk) < self.chunk_size and not heap[0][1]:
+                entry = heapq.heappop(heap)
+                if self._is_live(entry):
+                    chunk.append(entry)
+
+            values = self._score([entry[4] for entry in chunk])
+            self.scored += len(chunk)
+            for (_, _, order, key, item), value in zip(chunk, values):
+                entry = (-value, True, order, key, item)
+                self._entries[key] = entry
+                heapq.heappush(heap, entry)
+
+        return None
+
+    def peek(self) -> Optional[tuple[Hashable, T, float]]:
+        """Return the key, item and score of the best item without removing it."""
+        with self._lock:
+            entry = self._resolve()
+        if entry is None:
+            return None
+        return entry[3], entry[4], -entry[0]
+
+    def pop(self) -> Optional[tuple[Hashable, T, float]]:
+        with self._lock:
+            top = self.peek()
+            if top is not None:
+                self.remove(top[0])
+            return top
+
+    def prefetch(self, n: int) -> None:
+        """Score entries until the n best items are all scored, without changing the order."""
+        with self._lock:
+            # The best entries are set aside so that the ones below them reach the top
+            best = []
+            while len(best) < n:
+                entry = self._resolve()
+                if entry is None:
+                    break
+                best.append(heapq.heappop(self._heap))
+            for entry in best:
+                heapq.heappush(self._heap, entry)
+
+    def get_score(self, key: Hashable) -> Optional[float]:
+        """Return the score of an item, or None if it is not in the queue or not scored yet."""
+        entry = self._entries.get(key)
+        if entry is None or not entry[1]:
+            return None
+        return -entry[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
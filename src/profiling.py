@@ -0,0 +1,72 @@
+import json
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Iterator, Optional
+
+
+class Profiler:
+    """
+    Cumulative wall-clock timers and event counters of the hot paths.
+    Kernels report through the module-level `count` and `timer`, which do nothing while the
+    profiler is disabled. Safe to share between threads.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            # Timer name -> [calls, seconds]
+            self._timers: dict[str, list] = {}
+            self._counters: dict[str, int] = {}
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - tic
+            with self._lock:
+                entry = self._timers.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def report(self, extra: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """Snapshot of the timers and counters, with `extra` sections merged in."""
+        with self._lock:
+            report: dict[str, Any] = {
+                "enabled": self.enabled,
+                "started": self.started,
+                "seconds": time.time() - self.started,
+                "timers": {
+                    name: {"calls": calls, "seconds": seconds}
+                    for name, (calls, seconds) in sorted(self._timers.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+            }
+        if extra:
+            report.update(extra)
+        return report
+
+    def to_json(self, extra: Optional[dict[str, Any]] = None) -> str:
+        return json.dumps(self.report(extra), indent=2)
+
+
+# Enabled from the add-on's config; off by default so that the kernels run uninstrumented
+profiler = Profiler(enabled=False)
+count = profiler.count
+timer = profiler.timer
@@ -1,19 +1,37 @@
-from json import tool
+import time
+from typing import Iterable, Iterator, Optional, Union
+
 import anki
 from anki.cards import Card
 from anki.cards_pb2 import FsrsMemoryState
-from anki.scheduler.v3 import QueuedCards
+from anki.collection import OpChanges, OpChangesAfterUndo
+from anki.scheduler.v3 import QueuedCards, SchedulingContext
 from anki.scheduler.v3 import Scheduler as V3Scheduler
-from anki.utils import int_time
+from anki.stats import QUEUE_TYPE_REV
 from aqt import gui_hooks, mw
+from aqt.operations import QueryOp
 from aqt.reviewer import Reviewer, V3CardInfo
 
+from .candidates import ReviewCandidate, iter_review_candidates
 from .config_manager import get_config
-from .fsrs.types import State
+from .fsrs.cache import clear_caches
+from .fsrs.types import State, StateBatch
+from .last_review import get_last_review_index
+from .longterm_knowledge.delayed.interfaces import KnowledgeDelayedProtocol
+from .longterm_knowledge.discounted.interfaces import KnowledgeDiscountedProtocol
+from .longterm_knowledge.parallel import PARALLEL_THRESHOLD, ParallelScorer
+from .longterm_knowledge.ranking import TOP_K_CHUNK_SIZE, RankedQueue
+from .profiling import count, timer
+from .score_store import SCHEDULE_DAYS, ScoreKey, get_score_store
+from .scores import get_ranking, set_ranking
+from .storage import close_storage
 from .utils import (
+    KNOWLEDGE_GAIN_LOOKAHEAD,
+    get_delayed_fsrs,
+    get_exam_day,
+    get_exam_today,
     get_fsrs,
-    get_knowledge_gain,
-    get_last_review_timestamp,
+    get_last_review_timestamps,
 )
 
 Learning = anki.scheduler_pb2.SchedulingState.Learning
@@ -25,32 +43,434 @@ _get_next_v3_card_original = Reviewer._get_next_v3_card
 
 cache = {}
 
-queue_to_index = {
-    QueuedCards.NEW: 0,
-    QueuedCards.LEARNING: 1,
-    QueuedCards.REVIEW: 2,
-}
+# Minimum seconds between top-ups started because the queue is shorter than the review count
+TOP_UP_INTERVAL = 60.0
+
+# Number of best cards kept scored in the background, so that the reviewer rarely has to score
+PREFETCH_CARDS = 4
+
+# Discounted knowledge model, or the delayed one in exam mode
+KnowledgeModel = Union[KnowledgeDiscountedProtocol, KnowledgeDelayedProtocol]
+
+
+def _get_deck_fsrs(deck_id: int, ranking: dict) -> Optional[KnowledgeModel]:
+    """Resolve the FSRS model of a deck once per ranking."""
+    models = ranking["models"]
+    if deck_id not in models:
+        with timer("ranking.deck_config"):
+            deck_config = mw.col.decks.config_dict_for_deck_id(deck_id)
+            if ranking["exam_day"] is None:
+                models[deck_id] = get_fsrs(deck_config)
+            else:
+                models[deck_id] = get_delayed_fsrs(deck_config, due=ranking["exam_day"])
+    return models[deck_id]
+
+
+def _group_by_fsrs(
+    cards: list[ReviewCandidate], ranking: dict
+) -> dict[KnowledgeModel, list[int]]:
+    """Indices of the cards with a memory state, grouped by the FSRS model of their deck."""
+    groups: dict[KnowledgeModel, list[int]] = {}
+    for i, card in enumerate(cards):
+        if not card.has_state:
+            continue
+        fsrs = _get_deck_fsrs(card.deck_id, ranking)
+        if fsrs is not None:
+            groups.setdefault(fsrs, []).append(i)
+    return groups
+
+
+def _run_batch(fsrs: KnowledgeModel, method: str, *columns, **kwargs):
+    """Run a batch method of a model, on a process pool if parallel scoring is enabled."""
+    if not config.parallel_scoring:
+        return getattr(fsrs, method)(*columns, **kwargs)
+
+    # Models compare by parameters only, so tell the kinds of models and due dates apart
+    key = (type(fsrs), fsrs, getattr(fsrs, "due", None))
+    scorers = cache.setdefault("scorers", {})
+    if key not in scorers:
+        scorers[key] = ParallelScorer(fsrs)
+    return scorers[key].map(method, *columns, **kwargs)
+
+
+def _close_scorers() -> None:
+    for scorer in cache.pop("scorers", {}).values():
+        scorer.close()
 
 
-def _exp_knowledge_gain(x):
+def _elapsed_days(card: ReviewCandidate, ranking: dict) -> float:
+    # Cards reviewed after the reference time of the day count as just reviewed
+    return max(0.0, (ranking["now"] - ranking["last_review_timestamps"][card.id]) / 86400.0)
+
+
+def _group_states(group: list[ReviewCandidate], ranking: dict) -> StateBatch:
+    """Memory states and elapsed days of cards that all have a memory state."""
+    return StateBatch(
+        [card.difficulty for card in group],
+        [card.stability for card in group],
+        [_elapsed_days(card, ranking) for card in group],
+    )
+
+
+def _score_keys(cards: list[ReviewCandidate], ranking: dict) -> dict[int, ScoreKey]:
+    """Score store keys of the cards that have a memory state and an FSRS model."""
+    keys = {}
+    for card in cards:
+        if not card.has_state:
+            continue
+        fsrs = _get_deck_fsrs(card.deck_id, ranking)
+        if fsrs is None:
+            continue
+        keys[card.id] = (
+            card.difficulty,
+            card.stability,
+            int(ranking["last_review_timestamps"][card.id]),
+            # Exam mode scores also depend on the exam date
+            hash(fsrs) if ranking["exam_day"] is None else hash((fsrs, ranking["exam_day"])),
+        )
+    return keys
+
+
+def _exp_knowledge_gain_schedules(
+    cards: list[ReviewCandidate], ranking: dict, days: int = 1
+) -> list[list[float]]:
+    """Knowledge gains of each card on the ranking's day and the `days` - 1 days after it."""
     # There is no need to cache this function, as it is only called once per card
-    card = x.card
-    deck_id = card.original_deck_id or card.deck_id
+    schedules = [[0.0] * days for _ in cards]
+
+    for fsrs, indices in _group_by_fsrs(cards, ranking).items():
+        states = _group_states([cards[i] for i in indices], ranking)
+
+        # All days are evaluated in a single batch
+        if ranking["exam_day"] is None:
+            knowledge_gains = _run_batch(
+                fsrs,
+                "exp_knowledge_gain_batch",
+                states.difficulties.tolist() * days,
+                states.stabilities.tolist() * days,
+                [elapsed + day for day in range(days) for elapsed in states.elapsed_days],
+                lookahead=KNOWLEDGE_GAIN_LOOKAHEAD,
+            )
+        else:
+            knowledge_gains = _exam_knowledge_gains(fsrs, states, ranking, days)
+        m = len(states)
+        for j, i in enumerate(indices):
+            schedules[i] = list(knowledge_gains[j::m])
+
+    return schedules
+
+
+def _exam_knowledge_gains(
+    fsrs: KnowledgeDelayedProtocol,
+    states: StateBatch,
+    ranking: dict,
+    days: int,
+) -> list[float]:
+    """
+    Exam mode knowledge gains of the cards on consecutive days, laid out day by day.
+    Days from the exam on score 0, and are not used as the ranking switches back to the
+    discounted knowledge then.
+    """
+    exam_days = [
+        day for day in range(days) if get_exam_today(ranking["day"] + day) <= ranking["exam_day"]
+    ]
+    knowledge_gains = _run_batch(
+        fsrs,
+        "exp_knowledge_gain_future_batch",
+        states.difficulties.tolist() * len(exam_days),
+        states.stabilities.tolist() * len(exam_days),
+        [elapsed + day for day in exam_days for elapsed in states.elapsed_days],
+        [get_exam_today(ranking["day"] + day) for day in exam_days for _ in range(len(states))],
+    )
+    return list(knowledge_gains) + [0.0] * (len(states) * (days - len(exam_days)))
+
+
+def _score_cards(cards: list[ReviewCandidate], ranking: dict) -> list[float]:
+    """
+    Score cards for the ranked queue. The scores of the next days are computed along with them
+    and stored, so that later sessions and days can reuse them.
+    """
+    with timer("ranking.scoring"):
+        schedules = _exp_knowledge_gain_schedules(cards, ranking, days=SCHEDULE_DAYS)
+
+    keys = _score_keys(cards, ranking)
+    with timer("ranking.score_store_save"):
+        get_score_store().save(
+            [
+                (card.id, keys[card.id], ranking["day"], schedule)
+                for card, schedule in zip(cards, schedules)
+                if card.id in keys
+            ]
+        )
+
+    return [schedule[0] for schedule in schedules]
+
+
+def _exp_knowledge_gain_bounds(cards: list[ReviewCandidate], ranking: dict) -> list[float]:
+    # Must never be below _exp_knowledge_gains, so that the queue can put off scoring safely
+    bounds = [0.0] * len(cards)
+
+    for fsrs, indices in _group_by_fsrs(cards, ranking).items():
+        states = _group_states([cards[i] for i in indices], ranking)
+        columns = [states.stabilities, states.elapsed_days]
+        if ranking["exam_day"] is not None:
+            columns.append([get_exam_today(ranking["day"])] * len(states))
+        group_bounds = _run_batch(fsrs, "exp_knowledge_gain_bound_batch", *columns)
+        for i, bound in zip(indices, group_bounds):
+            bounds[i] = bound
+
+    return bounds
+
+
+def _iter_queued_review_candidates(col) -> Iterator[list[ReviewCandidate]]:
+    """
+    Review candidates from the scheduler's queue.
+    Filtered decks keep their own order in the due column, so they cannot be paged from the
+    cards table and are fetched all at once instead.
+    """
+    extend_limits = col.card_count()
+
+    with timer("ranking.queued_cards"):
+        col.sched.extend_limits(0, extend_limits)
+        output_all = col.sched.get_queued_cards(fetch_limit=extend_limits)
+        col.sched.extend_limits(0, -extend_limits)
+
+    yield ReviewCandidate.from_backend_cards(
+        [card.card for card in output_all.cards if card.queue == QueuedCards.REVIEW]
+    )
+
+
+def _review_candidate_pages(col, deck_id: int) -> Iterable[list[ReviewCandidate]]:
+    if col.decks.is_filtered(deck_id):
+        # The queue is fetched right away, as extending the limits from a background thread
+        # would also affect the reviewer
+        return list(_iter_queued_review_candidates(col))
+    deck_ids = col.decks.deck_and_child_ids(deck_id)
+    if config.parallel_scoring:
+        # Pages large enough for their bounds to be computed on the process pool
+        return iter_review_candidates(deck_ids, page_size=PARALLEL_THRESHOLD)
+    return iter_review_candidates(deck_ids)
+
+
+def _queued_card(col, card_id: int) -> Optional[QueuedCards.QueuedCard]:
+    """Build the queue entry of a ranked card, or None if it is no longer a due review."""
+    card = col._backend.get_card(card_id)
+    if card.queue != QUEUE_TYPE_REV:
+        return None
+    if not card.original_deck_id and card.due > col.sched.today:
+        # Answered since the ranking was built
+        return None
+
+    return QueuedCards.QueuedCard(
+        card=card,
+        queue=QueuedCards.REVIEW,
+        states=col._backend.get_scheduling_states(card_id),
+        # Only custom scheduling scripts read the context
+        context=SchedulingContext(
+            deck_name=col.decks.name(card.deck_id),
+            seed=card.id + card.reps,
+        ),
+    )
+
+
+def _review_candidate_entries(
+    ranking: dict,
+    pages: Iterable[list[ReviewCandidate]],
+    generation: int,
+) -> Optional[list[tuple[ReviewCandidate, float, bool]]]:
+    """
+    Queue entries of the candidates that are not in the ranking's queue yet, as
+    (card, value, scored) tuples. Cards with a stored score enter the queue scored. The others
+    enter with an upper bound of their knowledge gain and are only scored once they get near
+    the top. Returns None if `generation` was superseded before all pages were read.
+    """
+    queue: RankedQueue[ReviewCandidate] = ranking["queue"]
+    entries = []
+
+    with timer("ranking.last_review_index"):
+        get_last_review_index().check(full=True)
+
+    pages = iter(pages)
+    while True:
+        with timer("ranking.candidate_pages"):
+            page = next(pages, None)
+        if page is None:
+            return entries
+        if cache.get("generation") != generation:
+            return None
+
+        page = [card for card in page if card.id not in queue]
+        count("ranking.candidates", len(page))
+        with timer("ranking.last_review"):
+            ranking["last_review_timestamps"].update(get_last_review_timestamps(page))
+
+        with timer("ranking.score_store_load"):
+            stored_scores = get_score_store().load(_score_keys(page, ranking), ranking["day"])
+        unscored = [card for card in page if card.id not in stored_scores]
+        with timer("ranking.bounds"):
+            bounds = dict(
+                zip((card.id for card in unscored), _exp_knowledge_gain_bounds(unscored, ranking))
+            )
+
+        for card in page:
+            if card.id in stored_scores:
+                entries.append((card, stored_scores[card.id], True))
+            else:
+                entries.append((card, bounds[card.id], False))
+
+
+def _push_entries(ranking: dict, entries: list[tuple[ReviewCandidate, float, bool]]) -> None:
+    queue: RankedQueue[ReviewCandidate] = ranking["queue"]
+    with timer("ranking.push"):
+        for card, value, scored in entries:
+            # Cards may have entered the queue since their entries were built
+            if card.id not in queue:
+                queue.push(card.id, card, value, scored=scored)
+
+
+def _reference_time(day: int) -> int:
+    """
+    Time the elapsed days of a ranking are measured at: noon of the scheduler day.
+    Being a whole number of days apart, the reference times of consecutive days line up with the
+    columns of the stored score schedules.
+    """
+    sched = mw.col.sched
+    return sched.day_cutoff + (day - sched.today) * 86400 - 43200
+
+
+def _build_ranking(
+    deck_id: int, pages: Iterable[list[ReviewCandidate]], generation: int
+) -> Optional[dict]:
+    """Rank the review candidates of a deck; runs on a background thread."""
+    tic = time.perf_counter()
+    day = mw.col.sched.today
+    ranking = {
+        "deck_id": deck_id,
+        "day": day,
+        "exam_day": get_exam_day(),
+        "now": _reference_time(day),
+        "last_review_timestamps": {},
+        "models": {},
+    }
+    # With parallel scoring, chunks are large enough to be scored on the process pool
+    chunk_size = (
+        PARALLEL_THRESHOLD // SCHEDULE_DAYS if config.parallel_scoring else TOP_K_CHUNK_SIZE
+    )
+    ranking["queue"] = RankedQueue(
+        score=lambda chunk: _score_cards(chunk, ranking), chunk_size=chunk_size
+    )
 
-    if not card.memory_state:
-        return 0
+    entries = _review_candidate_entries(ranking, pages, generation)
+    if entries is None:
+        return None
+    _push_entries(ranking, entries)
 
-    state = State(float(card.memory_state.difficulty), float(card.memory_state.stability))
+    # Score the first cards here rather than on the main thread
+    with timer("ranking.peek"):
+        ranking["queue"].prefetch(PREFETCH_CARDS)
+    ranking["build_seconds"] = time.perf_counter() - tic
+    count("ranking.builds")
 
-    elapsed_days = (cache.get("now", int_time()) - get_last_review_timestamp(card)) / 86400.0
+    return ranking
 
-    deck_config = mw.col.decks.config_dict_for_deck_id(deck_id)
 
-    knowledge_gain = (
-        get_knowledge_gain(state, elapsed_days=elapsed_days, deck_config=deck_config) or 0.0
+def _start_ranking(deck_id: int) -> None:
+    """
+    Rank the deck in the background. The ranking replaces the current one once it is ready,
+    unless another ranking was started or the deck options changed in the meantime.
+    """
+    generation = cache["generation"] = cache.get("generation", 0) + 1
+    cache["pending_deck_id"] = deck_id
+    pages = _review_candidate_pages(mw.col, deck_id)
+
+    def on_success(ranking: Optional[dict]) -> None:
+        if ranking is None or cache.get("generation") != generation:
+            return
+        set_ranking(ranking)
+        cache["pending_deck_id"] = None
+
+    def on_failure(exception: Exception) -> None:
+        if cache.get("generation") == generation:
+            cache["pending_deck_id"] = None
+        raise exception
+
+    QueryOp(
+        parent=mw,
+        op=lambda col: _build_ranking(deck_id, pages, generation),
+        success=on_success,
+    ).failure(on_failure).run_in_background()
+
+
+def _should_top_up(ranking: dict, review_count: int) -> bool:
+    if cache.get("top_up_pending"):
+        return False
+    if cache.get("top_up"):
+        return True
+    # The review count may include cards the ranking cannot serve, so the shortfall alone is
+    # only rechecked once per interval
+    last_top_up = cache.get("top_up_time")
+    return len(ranking["queue"]) < review_count and (
+        last_top_up is None or time.monotonic() - last_top_up >= TOP_UP_INTERVAL
     )
-    
-    return knowledge_gain
+
+
+def _start_top_up(ranking: dict, deck_id: int) -> None:
+    """Add the cards missing from the ranking in the background, e.g. after an undo or a sync."""
+    cache["top_up"] = False
+    cache["top_up_pending"] = True
+    cache["top_up_time"] = time.monotonic()
+    generation = cache.get("generation", 0)
+    pages = _review_candidate_pages(mw.col, deck_id)
+
+    def op(col) -> Optional[list[tuple[ReviewCandidate, float, bool]]]:
+        with timer("ranking.top_up"):
+            return _review_candidate_entries(ranking, pages, generation)
+
+    def on_success(entries: Optional[list[tuple[ReviewCandidate, float, bool]]]) -> None:
+        cache["top_up_pending"] = False
+        if entries is not None and get_ranking() is ranking:
+            _push_entries(ranking, entries)
+
+    def on_failure(exception: Exception) -> None:
+        cache["top_up_pending"] = False
+        raise exception
+
+    QueryOp(parent=mw, op=op, success=on_success).failure(on_failure).run_in_background()
+
+
+def _start_prefetch(ranking: dict) -> None:
+    """
+    Score the next cards of the ranking in the background while the current one is reviewed.
+    Without this, the reviewer would score a whole chunk of cards each time the top card of the
+    queue is unscored.
+    """
+    if cache.get("prefetch_pending"):
+        return
+    cache["prefetch_pending"] = True
+
+    def op(col) -> None:
+        with timer("ranking.prefetch"):
+            ranking["queue"].prefetch(PREFETCH_CARDS)
+
+    def on_success(_) -> None:
+        cache["prefetch_pending"] = False
+
+    def on_failure(exception: Exception) -> None:
+        cache["prefetch_pending"] = False
+        raise exception
+
+    QueryOp(parent=mw, op=op, success=on_success).failure(on_failure).run_in_background()
+
+
+def _cancel_ranking() -> None:
+    cache["generation"] = cache.get("generation", 0) + 1
+    cache["pending_deck_id"] = None
+    set_ranking(None)
+
+
+def reset_ranking() -> None:
+    """Drop the current ranking after a setting the scores depend on changed."""
+    _cancel_ranking()
 
 
 def _get_next_v3_card_patched(self) -> None:
@@ -59,7 +479,8 @@ def _get_next_v3_card_patched(self) -> None:
     https://github.com/ankitects/anki/blob/208729fa3e3ecb261c359c9a75e83291e80b499d/qt/aqt/reviewer.py#L264
     """
     assert isinstance(self.mw.col.sched, V3Scheduler)
-    output = self.mw.col.sched.get_queued_cards()
+    with timer("reviewer.queued_cards"):
+        output = self.mw.col.sched.get_queued_cards()
     if not output.cards:
         return
     self._v3 = V3CardInfo.from_queue(output)
@@ -69,71 +490,63 @@ def _get_next_v3_card_patched(self) -> None:
     if idx in [QueuedCards.REVIEW]:
         deck_id = self.mw.col.decks.current()['id']
 
-        if (
-            cache.get("cards_cached") is None
-            or cache.get("deck_id_cached") != deck_id
-            or sum(counts[2:]) != len(cache.get("cards_cached", []))
-            or counts[queue_to_index[cache.get("cards_cached", [])[-1].queue]] <= 0
-            or abs(cache["now"] - int_time()) >= 86400.0
-        ):
-            # Refresh the cache
-            cache["deck_id_cached"] = deck_id
-
-            # Fetch all cards
-            extend_limits = self.mw.col.card_count()
-
-            self.mw.col.sched.extend_limits(0, extend_limits)
-            output_all = self.mw.col.sched.get_queued_cards(fetch_limit=extend_limits)
-            self.mw.col.sched.extend_limits(0, -extend_limits)
-
-            # Filter cards based on the queue
-            cards = [card for card in output_all.cards if card.queue in [QueuedCards.REVIEW]]
-
-            # Sort the cards
-            cache["now"] = int_time()
-            sorted_cards = sorted(cards, key=_exp_knowledge_gain, reverse=True)
-
-            # Filter cards based on the counts
-            filtered_counts = [0, 0, 0]
-            filtered_cards = []
-            for card in sorted_cards:
-                index = queue_to_index[card.queue]
-                if filtered_counts[index] < counts[index]:
-                    filtered_cards.append(card)
-                    filtered_counts[index] += 1
-
-            # Make a stack of the filtered cards
-            cache["cards_cached"] = list(reversed(filtered_cards))
-        else:
-            # Disable undo
-            self.mw.col.sched.extend_limits(0, 0)
-
-        top_card = cache["cards_cached"][-1]
-
-        # Update the V3CardInfo with the top card
-        del self._v3.queued_cards.cards[:]
-        self._v3.queued_cards.cards.extend([top_card])
-        self._v3.states = top_card.states
-        self._v3.states.current.custom_data = top_card.card.custom_data
-        self._v3.context = top_card.context
+        ranking = get_ranking()
+        if ranking is not None and ranking["deck_id"] != deck_id:
+            ranking = None
+
+        if ranking is None or ranking["day"] != self.mw.col.sched.today:
+            # Until the new ranking is ready, an outdated ranking of the same deck is still
+            # served, and otherwise the default order
+            if cache.get("pending_deck_id") != deck_id:
+                _start_ranking(deck_id)
+        elif _should_top_up(ranking, counts[2]):
+            # Cards came back after an undo or a sync; only the missing ones are added
+            _start_top_up(ranking, deck_id)
+
+        top_card = None
+        if ranking is not None:
+            queue: RankedQueue[ReviewCandidate] = ranking["queue"]
+
+            # Only the top card is turned into a queue entry; cards that were buried or
+            # answered elsewhere in the meantime are dropped
+            with timer("reviewer.top_card"):
+                while top_card is None and len(queue):
+                    card_id, _, _ = queue.peek()
+                    top_card = _queued_card(self.mw.col, card_id)
+                    if top_card is None:
+                        count("reviewer.stale_cards")
+                        queue.remove(card_id)
+            _start_prefetch(ranking)
+
+        if top_card is not None:
+            # Update the V3CardInfo with the top card
+            del self._v3.queued_cards.cards[:]
+            self._v3.queued_cards.cards.extend([top_card])
+            self._v3.states = top_card.states
+            self._v3.states.current.custom_data = top_card.card.custom_data
+            self._v3.context = top_card.context
 
     self.card = Card(self.mw.col, backend_card=self._v3.top_card().card)
     self.card.start_timer()
 
 
+def _remove_from_ranking(card_id: int) -> None:
+    ranking = get_ranking()
+    if ranking is not None:
+        ranking["queue"].remove(card_id)
+
+
 def _on_card_answered(reviewer, card, ease):
-    if cache.get("cards_cached") and cache["cards_cached"][-1].card.id == card.id:
-        cache["cards_cached"].pop()
+    get_last_review_index().record_answer()
+    _remove_from_ranking(card.id)
 
 
 def _on_card_buried(id: int) -> None:
-    if cache.get("cards_cached") and cache["cards_cached"][-1].card.id == id:
-        cache["cards_cached"].pop()
+    _remove_from_ranking(id)
 
 
 def _on_card_suspended(id: int) -> None:
-    if cache.get("cards_cached") and cache["cards_cached"][-1].card.id == id:
-        cache["cards_cached"].pop()
+    _remove_from_ranking(id)
 
 
 def _on_card_will_show(text: str, card: Card, kind: str) -> str:
@@ -205,6 +618,29 @@ def _on_card_will_show(text: str, card: Card, kind: str) -> str:
     return text
 
 
+def _on_operation_did_execute(changes: OpChanges, handler) -> None:
+    if changes.deck_config:
+        # FSRS parameters may have changed, and with them every score in the queue
+        clear_caches()
+        _cancel_ranking()
+        _close_scorers()
+
+
+def _on_state_did_undo(changes: OpChangesAfterUndo) -> None:
+    # An undone answer removes its revlog entry, and the card's last review goes back with it
+    get_last_review_index().check(full=True)
+    # An undone answer, bury or suspension makes a card due again
+    cache["top_up"] = True
+
+
+def _on_sync_did_finish() -> None:
+    if mw.col is None:
+        return
+    # Synced reviews may predate the newest local one
+    get_last_review_index().check(full=True)
+    cache["top_up"] = True
+
+
 def update_reordering():
     if config.reorder_cards:
         Reviewer._get_next_v3_card = _get_next_v3_card_patched
@@ -218,3 +654,9 @@ def init_reordering():
     gui_hooks.reviewer_will_bury_card.append(_on_card_buried)
     gui_hooks.reviewer_will_suspend_card.append(_on_card_suspended)
     gui_hooks.card_will_show.append(_on_card_will_show)
+    gui_hooks.operation_did_execute.append(_on_operation_did_execute)
+    gui_hooks.state_did_undo.append(_on_state_did_undo)
+    gui_hooks.sync_did_finish.append(_on_sync_did_finish)
+    gui_hooks.profile_will_close.append(_cancel_ranking)
+    gui_hooks.profile_will_close.append(_close_scorers)
+    gui_hooks.profile_will_close.append(close_storage)
@@ -0,0 +1,120 @@
+import sqlite3
+import time
+from array import array
+from typing import Optional, Sequence
+
+from .storage import get_storage, storage_lock
+
+# Number of card ids per lookup query, below SQLite's limit on bound parameters
+LOAD_CHUNK_SIZE = 500
+
+# Number of consecutive days scored at once, so that the next days can reuse the scores
+SCHEDULE_DAYS = 4
+
+# Memory state, last review timestamp and FSRS parameters hash a score schedule was computed for
+ScoreKey = tuple[float, float, int, int]
+
+
+class ScoreStore:
+    """
+    Persistent knowledge gains of review cards, so that a ranking can start from the scores of
+    an earlier session or an earlier day.
+
+    Each card has a schedule of scores for consecutive days starting at `first_day`. A score is
+    reused only if the card's memory state, last review and FSRS parameters are unchanged and the
+    schedule covers the requested day.
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+        # Shared with the last review index, which uses the same connection
+        self._lock = storage_lock
+        with self._lock:
+            db.execute(
+                """
+            CREATE TABLE IF NOT EXISTS score_schedules (
+                cid INTEGER PRIMARY KEY,
+                difficulty REAL NOT NULL,
+                stability REAL NOT NULL,
+                last_review INTEGER NOT NULL,
+                params INTEGER NOT NULL,
+                first_day INTEGER NOT NULL,
+                scores BLOB NOT NULL
+            )
+            """
+            )
+        self.reset_stats()
+
+    def load(self, keys: dict[int, ScoreKey], day: int) -> dict[int, float]:
+        """Return the stored scores on `day` of the cards whose key is unchanged."""
+        tic = time.perf_counter()
+
+        scores = {}
+        card_ids = list(keys)
+        with self._lock:
+            for start in range(0, len(card_ids), LOAD_CHUNK_SIZE):
+                chunk = card_ids[start : start + LOAD_CHUNK_SIZE]
+                rows = self.db.execute(
+                    f"""
+                SELECT cid, difficulty, stability, last_review, params, first_day, scores
+                FROM score_schedules
+                WHERE cid IN ({", ".join("?" * len(chunk))}) AND first_day <= ?
+                """,
+                    chunk + [day],
+                )
+                for cid, difficulty, stability, last_review, params, first_day, blob in rows:
+                    column = day - first_day
+                    if (difficulty, stability, last_review, params) != keys[cid]:
+                        continue
+                    if 8 * column >= len(blob):
+                        continue
+                    scores[cid] = array("d", blob[8 * column : 8 * column + 8])[0]
+
+            self.hits += len(scores)
+            self.misses += len(keys) - len(scores)
+            self.load_seconds += time.perf_counter() - tic
+
+        return scores
+
+    def save(self, schedules: list[tuple[int, ScoreKey, int, Sequence[float]]]) -> None:
+        """Store (card id, key, first day, scores of consecutive days) schedules."""
+        if not schedules:
+            return
+
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO score_schedules VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (cid, *key, first_day, array("d", scores).tobytes())
+                    for cid, key, first_day, scores in schedules
+                ],
+            )
+            self.saved += len(schedules)
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.saved = 0
+        self.load_seconds = 0.0
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "load_seconds": self.load_seconds,
+            "saved": self.saved,
+        }
+
+
+_store: Optional[ScoreStore] = None
+
+
+def get_score_store() -> ScoreStore:
+    global _store
+
+    with storage_lock:
+        db = get_storage()
+        if _store is None or _store.db is not db:
+            _store = ScoreStore(db)
+
+        return _store
@@ -0,0 +1,68 @@
+from typing import Optional
+
+from anki.cards import Card
+from aqt import mw
+
+from .fsrs.cache import lru_cached
+from .fsrs.types import State
+from .utils import get_elapsed_days, get_exam_day, get_knowledge_gain
+
+# Capacity of the cache of knowledge gains computed for cards outside the ranking
+ON_DEMAND_CACHE_SIZE = 256
+
+_ranking: Optional[dict] = None
+
+
+def get_ranking() -> Optional[dict]:
+    """The ranking the reviewer currently serves cards from."""
+    return _ranking
+
+
+def set_ranking(ranking: Optional[dict]) -> None:
+    global _ranking
+    _ranking = ranking
+
+
+@lru_cached("knowledge_gain_on_demand", ON_DEMAND_CACHE_SIZE)
+def _knowledge_gain_on_demand(
+    card_id: int,
+    deck_id: int,
+    difficulty: float,
+    stability: float,
+    day: int,
+    exam_day: Optional[int],
+) -> Optional[float]:
+    # Keyed by day, so a card rendered again on the same day is not scored twice
+    card = mw.col.get_card(card_id)
+    deck_config = mw.col.decks.config_dict_for_deck_id(deck_id)
+
+    return get_knowledge_gain(
+        State(difficulty, stability),
+        elapsed_days=get_elapsed_days(card),
+        deck_config=deck_config,
+        exam_day=exam_day,
+    )
+
+
+def get_card_knowledge_gain(card: Card) -> Optional[float]:
+    """
+    Expected knowledge gain of a review card, or None without FSRS.
+    The score from the current ranking is used if the card was scored there, so the number
+    matches the order cards are shown in. Other cards are scored on demand.
+    """
+    if not card.memory_state:
+        return None
+
+    if _ranking is not None:
+        score = _ranking["queue"].get_score(card.id)
+        if score is not None:
+            return score
+
+    return _knowledge_gain_on_demand(
+        card.id,
+        card.odid or card.did,
+        float(card.memory_state.difficulty),
+        float(card.memory_state.stability),
+        mw.col.sched.today,
+        get_exam_day(),
+    )
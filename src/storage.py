@@ -0,0 +1,51 @@
+import os
+import sqlite3
+from threading import RLock
+from typing import Optional
+
+from aqt import mw
+
+from .config_manager import addon_identifier
+
+_connection: Optional[sqlite3.Connection] = None
+_profile: Optional[str] = None
+
+# The connection is shared by the main thread and the ranking's background thread. Every use of
+# it, transactions included, must hold this lock, so that one component's commit or rollback
+# never ends another's transaction halfway. Reentrant, so that holders can call get_storage.
+storage_lock = RLock()
+
+
+def get_user_files_folder() -> str:
+    """The add-on's user_files folder, which Anki keeps across add-on updates."""
+    folder = os.path.join(mw.addonManager.addonsFolder(addon_identifier), "user_files")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def get_storage() -> sqlite3.Connection:
+    """
+    Return the sidecar database of the current profile, stored in the user_files folder.
+    """
+    global _connection, _profile
+
+    with storage_lock:
+        if _connection is None or _profile != mw.pm.name:
+            close_storage()
+            _connection = sqlite3.connect(
+                os.path.join(get_user_files_folder(), f"{mw.pm.name}.db"),
+                check_same_thread=False,
+            )
+            _profile = mw.pm.name
+
+        return _connection
+
+
+def close_storage() -> None:
+    global _connection, _profile
+
+    with storage_lock:
+        if _connection is not None:
+            _connection.close()
+        _connection = None
+        _profile = None
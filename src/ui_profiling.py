@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from aqt import mw
+from aqt.utils import showText, tooltip
+
+from .fsrs.cache import cache_stats
+from .profiling import profiler
+from .score_store import get_score_store
+from .scores import get_ranking
+from .storage import get_user_files_folder
+
+
+def _transposition_caches(ranking: dict) -> dict:
+    """Transposition caches of the ranking's discounted knowledge models, by model."""
+    caches = {}
+    for model in ranking["models"].values():
+        cache = getattr(model, "transposition_cache", None)
+        if cache is not None:
+            caches[f"{type(model).__name__}@{hash(model):x}"] = cache
+    return caches
+
+
+def _profiling_report() -> dict:
+    extra: dict = {"caches": cache_stats(), "ranking": None}
+
+    ranking = get_ranking()
+    if ranking is not None:
+        extra["ranking"] = {
+            "day": ranking["day"],
+            "build_seconds": ranking["build_seconds"],
+            "queued_cards": len(ranking["queue"]),
+            "scored_cards": ranking["queue"].scored,
+            "transposition_caches": {
+                name: cache.stats() for name, cache in _transposition_caches(ranking).items()
+            },
+        }
+    if mw.col is not None:
+        extra["score_store"] = get_score_store().stats()
+
+    return profiler.report(extra)
+
+
+def show_profiling_statistics() -> None:
+    showText(
+        json.dumps(_profiling_report(), indent=2),
+        parent=mw,
+        title="Profiling statistics",
+        copyBtn=True,
+    )
+
+
+def save_profiling_statistics() -> None:
+    """Dump the statistics as JSON to the user_files folder, to attach to bug reports."""
+    path = os.path.join(get_user_files_folder(), time.strftime("profiling-%Y%m%d-%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(_profiling_report(), f, indent=2)
+
+    tooltip(f"Profiling statistics saved to {path}", parent=mw)
+
+
+def reset_profiling_statistics() -> None:
+    profiler.reset()
+    ranking = get_ranking()
+    if ranking is not None:
+        for cache in _transposition_caches(ranking).values():
+            cache.reset_stats()
+    if mw.col is not None:
+        get_score_store().reset_stats()
+    tooltip("Profiling statistics reset", parent=mw)
@@ -1,11 +1,9 @@
 from anki import hooks
 from anki.scheduler.v3 import QueuedCards
 from anki.template import TemplateRenderContext, TemplateRenderOutput
-from aqt import mw
 
 from .config_manager import get_config
-from .fsrs.types import State
-from .utils import get_elapsed_days, get_knowledge_gain
+from .scores import get_card_knowledge_gain
 
 config = get_config()
 
@@ -15,9 +13,6 @@ def _on_card_did_render(output: TemplateRenderOutput, context: TemplateRenderCon
         return
 
     card = context.card()
-    deck_id = card.odid or card.did
-
-    deck_config = mw.col.decks.config_dict_for_deck_id(deck_id)
 
     # Skip new, learning and relearning cards
     if card.queue not in [QueuedCards.REVIEW]:
@@ -25,13 +20,7 @@ def _on_card_did_render(output: TemplateRenderOutput, context: TemplateRenderCon
     elif not card.memory_state:
         return
     else:
-        state = State(
-            float(card.memory_state.difficulty),
-            float(card.memory_state.stability),
-        )
-        elapsed_days = get_elapsed_days(card)
-
-        ekg = get_knowledge_gain(state, elapsed_days=elapsed_days, deck_config=deck_config)
+        ekg = get_card_knowledge_gain(card)
 
     if ekg is not None:
         if ekg >= 0.1:
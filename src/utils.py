@@ -1,4 +1,5 @@
-from typing import Optional
+import datetime
+from typing import Optional, Sequence, Union
 
 from anki import cards_pb2
 from anki.cards import Card
@@ -10,18 +11,22 @@ from anki.stats import (
     QUEUE_TYPE_PREVIEW,
     QUEUE_TYPE_REV,
     QUEUE_TYPE_SUSPENDED,
-    REVLOG_CRAM,
     REVLOG_LRN,
     REVLOG_RELRN,
     REVLOG_RESCHED,
     REVLOG_REV,
 )
-from anki.stats_pb2 import CardStatsResponse
 from anki.utils import int_time
 from aqt import mw
 
+from .candidates import ReviewCandidate
 from .config_manager import get_config
 from .fsrs.types import State
+from .last_review import get_last_review_index
+from .longterm_knowledge.delayed.fsrs4 import FSRS4KnowledgeDelayed
+from .longterm_knowledge.delayed.fsrs5 import FSRS5KnowledgeDelayed
+from .longterm_knowledge.delayed.fsrs6 import FSRS6KnowledgeDelayed
+from .longterm_knowledge.delayed.interfaces import KnowledgeDelayedProtocol
 from .longterm_knowledge.discounted.fsrs4 import FSRS4KnowledgeDiscounted
 from .longterm_knowledge.discounted.fsrs5 import FSRS5KnowledgeDiscounted
 from .longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
@@ -31,40 +36,60 @@ BackendCard = cards_pb2.Card
 
 config = get_config()
 
-
-def get_revlogs(cid: int):
-    return mw.col.get_review_logs(cid)
-
-
-def filter_revlogs(
-    revlogs: list[CardStatsResponse.StatsRevlogEntry],
-) -> list[CardStatsResponse.StatsRevlogEntry]:
-    return list(
-        filter(
-            lambda x: x.button_chosen >= 1 and (x.review_kind != REVLOG_CRAM or x.ease != 0),
-            revlogs,
-        )
-    )
+# Lookahead of the knowledge gain shown and used for sorting, see exp_knowledge_gain
+KNOWLEDGE_GAIN_LOOKAHEAD = 2
+
+DELAYED_MODELS = {
+    4: FSRS4KnowledgeDelayed,
+    5: FSRS5KnowledgeDelayed,
+    6: FSRS6KnowledgeDelayed,
+}
+
+
+def _estimate_last_review_timestamp(card: Union[Card, BackendCard, ReviewCandidate]) -> float:
+    """Estimate the last review time of a card without revlog from its due date and interval."""
+    if isinstance(card, ReviewCandidate):
+        due = card.due
+        days_ago = card.interval
+    elif isinstance(card, BackendCard):
+        due = card.original_due if card.original_deck_id else card.due
+        days_ago = card.interval
+    else:
+        due = card.odue if card.odid else card.due
+        days_ago = card.ivl
+    # Approximate: deck due date (sched.day_cutoff is today's start time)
+    due_date_timestamp = mw.col.sched.day_cutoff + (due - mw.col.sched.today) * 86400
+    return due_date_timestamp - days_ago * 86400
+
+
+def get_last_review_timestamps(
+    cards: Sequence[Union[Card, BackendCard, ReviewCandidate]], full_check: bool = False
+) -> dict[int, float]:
+    """
+    Return the last review time of each card as Unix timestamps in seconds, keyed by card id.
+    Timestamps come from the last review index, which is first brought up to date with the
+    revlog; `full_check` also detects entries synced in out of order.
+    """
+    if not cards:
+        return {}
+
+    index = get_last_review_index()
+    index.check(full=full_check)
+
+    timestamps: dict[int, float] = {}
+    for card in cards:
+        timestamp = index.get(card.id)
+        if timestamp is None:
+            # No revlog — estimate based on due and interval
+            timestamp = _estimate_last_review_timestamp(card)
+        timestamps[card.id] = timestamp
+
+    return timestamps
 
 
 def get_last_review_timestamp(card: Card) -> float:
     """Return last review time as Unix timestamp in seconds."""
-    revlogs = get_revlogs(card.id)
-    try:
-        last_revlog = filter_revlogs(revlogs)[0]
-        # last_revlog.time is in seconds since epoch (backend API), or ms in SQL
-        return last_revlog.time
-    except IndexError:
-        # No revlog — estimate based on due and interval
-        if isinstance(card, BackendCard):
-            due = card.original_due if card.deck_id else card.due
-            days_ago = card.interval
-        else:
-            due = card.odue if card.odid else card.due
-            days_ago = card.ivl
-        # Approximate: deck due date (sched.day_cutoff is today's start time)
-        due_date_timestamp = mw.col.sched.day_cutoff + (due - mw.col.sched.today) * 86400
-        return due_date_timestamp - days_ago * 86400
+    return get_last_review_timestamps([card])[card.id]
 
 
 def get_elapsed_days(card: Card) -> float:
@@ -108,15 +133,67 @@ def get_fsrs(deck_config: dict[str, list[float]]) -> Optional[KnowledgeDiscounte
     return fsrs
 
 
+def get_delayed_fsrs(
+    deck_config: dict[str, list[float]], due: float
+) -> Optional[KnowledgeDelayedProtocol]:
+    """The exam mode model of a deck, for an exam on scheduler day `due`."""
+    fsrs = get_fsrs(deck_config)
+
+    if fsrs is None:
+        return None
+
+    return DELAYED_MODELS[fsrs.VERSION].from_tuple_with_due(fsrs.params, due=float(due))
+
+
+def get_exam_day() -> Optional[int]:
+    """
+    Scheduler day of the configured exam date, or None if exam mode is off.
+    Exam mode also ends on the day of the exam, as there is nothing left to schedule for.
+    """
+    if not config.exam_date:
+        return None
+
+    try:
+        exam_date = datetime.date.fromisoformat(config.exam_date)
+    except (TypeError, ValueError):
+        return None
+
+    sched = mw.col.sched
+    # Calendar date the current scheduler day started on
+    today = datetime.date.fromtimestamp(sched.day_cutoff - 86400)
+    exam_day = sched.today + (exam_date - today).days
+
+    return exam_day if exam_day > sched.today else None
+
+
+def get_exam_today(day: int) -> float:
+    """
+    The `today` argument of the delayed knowledge for reviews on scheduler day `day`.
+    Delayed knowledge counts from the day after the review, as in the evaluation.
+    """
+    return float(day + 1)
+
+
 def get_knowledge_gain(
-    state: State, elapsed_days: float, deck_config: dict[str, list[float]]
+    state: State,
+    elapsed_days: float,
+    deck_config: dict[str, list[float]],
+    exam_day: Optional[int] = None,
 ) -> Optional[float]:
+    if exam_day is not None:
+        delayed_fsrs = get_delayed_fsrs(deck_config, due=exam_day)
+        if delayed_fsrs is None:
+            return None
+        return delayed_fsrs.exp_knowledge_gain_future(
+            state, elapsed_days, today=get_exam_today(mw.col.sched.today)
+        )
+
     fsrs = get_fsrs(deck_config)
 
     if fsrs is None:
         return None
 
-    return fsrs.exp_knowledge_gain(state, elapsed_days, lookahead=2)
+    return fsrs.exp_knowledge_gain(state, elapsed_days, lookahead=KNOWLEDGE_GAIN_LOOKAHEAD)
 
 
 # def get_new_rating_probs(deck_id):
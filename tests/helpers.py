@@ -0,0 +1,26 @@
+"""Parameters and synthetic cards shared by the tests."""
+
+import random
+
+FSRS4_PARAMS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)  # fmt: skip
+FSRS5_PARAMS = (
+    0.40255, 1.18385, 3.173, 15.69105, 7.1949, 0.5345, 1.4604, 0.0046, 1.54575,
+    0.1192, 1.01925, 1.9395, 0.11, 0.29605, 2.2698, 0.2315, 2.9898, 0.51655, 0.6621,
+)  # fmt: skip
+FSRS6_PARAMS = (
+    0.8457, 8.1627, 17.1531, 100.0000, 6.2004, 0.8907, 3.0530, 0.0282, 2.3039,
+    0.0302, 1.2036, 1.3832, 0.0883, 0.1358, 1.5999, 0.5648, 2.2040, 0.7055,
+    0.1141, 0.0916, 0.1000,
+)  # fmt: skip
+
+
+def random_cards(n, seed=0):
+    """Difficulties, stabilities and elapsed days of `n` cards, some of them reviewed today."""
+    rng = random.Random(seed)
+    difficulties = [rng.uniform(1.0, 10.0) for _ in range(n)]
+    stabilities = [10 ** rng.uniform(-2, 4) for _ in range(n)]
+    elapsed_days = [rng.choice([0.0, 0.5, rng.uniform(1, 400)]) for _ in range(n)]
+    return difficulties, stabilities, elapsed_days
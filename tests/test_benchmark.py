@@ -0,0 +1,207 @@
+"""
+Throughput benchmarks of the knowledge kernels on synthetic decks.
+
+Runs with the rest of the tests on a 1e3-card deck. Environment variables:
+    BENCH_SIZES: Comma-separated deck sizes, e.g. "1000,10000,100000,1000000".
+    BENCH_UPDATE_BASELINE: If set, store the measured throughputs as the new baselines.
+    BENCH_SLOWDOWN: Factor below the baseline throughput that counts as a slowdown (default 2).
+    BENCH_STRICT: If set, slowdowns fail the benchmark instead of emitting a warning.
+    BENCH_OUTPUT: Path of a JSON file the measured throughputs are written to.
+"""
+
+import json
+import os
+import random
+import time
+import warnings
+
+import pytest
+
+from fsrs.cache import clear_caches
+from fsrs.types import State
+from helpers import FSRS4_PARAMS, FSRS5_PARAMS, FSRS6_PARAMS
+from longterm_knowledge.delayed.fsrs4 import FSRS4KnowledgeDelayed
+from longterm_knowledge.delayed.fsrs5 import FSRS5KnowledgeDelayed
+from longterm_knowledge.delayed.fsrs6 import FSRS6KnowledgeDelayed
+from longterm_knowledge.discounted.fsrs4 import FSRS4KnowledgeDiscounted
+from longterm_knowledge.discounted.fsrs5 import FSRS5KnowledgeDiscounted
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+SIZES = [int(float(size)) for size in os.environ.get("BENCH_SIZES", "1000").split(",")]
+SLOWDOWN = float(os.environ.get("BENCH_SLOWDOWN", "2"))
+SEED = 0
+
+# Small decks are timed over several rounds, keeping the fastest, to even out noise
+MIN_SECONDS = 0.2
+MAX_ROUNDS = 5
+
+# Exam date of the delayed models, in days from the collection's creation
+DUE = 500.0
+
+
+DISCOUNTED_MODELS = {
+    "fsrs4_discounted": lambda: FSRS4KnowledgeDiscounted.from_list(FSRS4_PARAMS),
+    "fsrs5_discounted": lambda: FSRS5KnowledgeDiscounted.from_list(FSRS5_PARAMS),
+    "fsrs6_discounted": lambda: FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS),
+}
+DELAYED_MODELS = {
+    "fsrs4_delayed": lambda: FSRS4KnowledgeDelayed.from_list_with_due(FSRS4_PARAMS, due=DUE),
+    "fsrs5_delayed": lambda: FSRS5KnowledgeDelayed.from_list_with_due(FSRS5_PARAMS, due=DUE),
+    "fsrs6_delayed": lambda: FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=DUE),
+}
+
+
+def _synthetic_deck(n, seed=SEED):
+    """Review cards with the spread of memory states of the efficiency notebook."""
+    rng = random.Random(seed)
+    return {
+        "difficulties": [rng.uniform(1.0, 10.0) for _ in range(n)],
+        "stabilities": [10 ** rng.uniform(-2, 2) for _ in range(n)],
+        "elapsed_days": [float(rng.randint(1, 365)) for _ in range(n)],
+        "todays": [float(rng.randint(1, 365)) for _ in range(n)],
+    }
+
+
+def _states(deck):
+    return [State(d, s) for d, s in zip(deck["difficulties"], deck["stabilities"])]
+
+
+def _discounted_kernels(fsrs, deck):
+    states = _states(deck)
+    elapsed_days = deck["elapsed_days"]
+    pairs = list(zip(states, elapsed_days))
+
+    kernels = {
+        "calc_knowledge": lambda: [fsrs.calc_knowledge(state, t) for state, t in pairs],
+        "calc_knowledge_batch": lambda: fsrs.calc_knowledge_batch(
+            deck["stabilities"], elapsed_days
+        ),
+        "simulate": lambda: [fsrs.simulate(state, t) for state, t in pairs],
+        "simulate_batch": lambda: fsrs.simulate_batch(
+            deck["difficulties"], deck["stabilities"], elapsed_days
+        ),
+    }
+    for lookahead in [0, 1, 2]:
+        kernels[f"exp_knowledge_gain_lookahead{lookahead}"] = lambda lookahead=lookahead: [
+            fsrs.exp_knowledge_gain(state, t, lookahead=lookahead) for state, t in pairs
+        ]
+        kernels[f"exp_knowledge_gain_batch_lookahead{lookahead}"] = (
+            lambda lookahead=lookahead: fsrs.exp_knowledge_gain_batch(
+                deck["difficulties"], deck["stabilities"], elapsed_days, lookahead=lookahead
+            )
+        )
+    return kernels
+
+
+def _delayed_kernels(fsrs, deck):
+    # Lookahead 0 is the one-review gain and lookahead 2 the future estimator; the delayed
+    # models have no tomorrow check
+    cases = list(zip(_states(deck), deck["elapsed_days"], deck["todays"]))
+    return {
+        "calc_knowledge": lambda: [fsrs.calc_knowledge(*case) for case in cases],
+        "simulate": lambda: [fsrs.simulate(state, t) for state, t, _ in cases],
+        "exp_knowledge_gain_lookahead0": lambda: [
+            fsrs.exp_knowledge_gain(*case) for case in cases
+        ],
+        "exp_knowledge_gain_lookahead2": lambda: [
+            fsrs.exp_knowledge_gain_future(*case) for case in cases
+        ],
+    }
+
+
+DISCOUNTED_KERNELS = [
+    "calc_knowledge",
+    "calc_knowledge_batch",
+    "simulate",
+    "simulate_batch",
+    *(f"exp_knowledge_gain_lookahead{lookahead}" for lookahead in [0, 1, 2]),
+    *(f"exp_knowledge_gain_batch_lookahead{lookahead}" for lookahead in [0, 1, 2]),
+]
+DELAYED_KERNELS = [
+    "calc_knowledge",
+    "simulate",
+    "exp_knowledge_gain_lookahead0",
+    "exp_knowledge_gain_lookahead2",
+]
+
+
+def _cases():
+    for size in SIZES:
+        for models, kernels in [
+            (DISCOUNTED_MODELS, DISCOUNTED_KERNELS),
+            (DELAYED_MODELS, DELAYED_KERNELS),
+        ]:
+            for model in models:
+                for kernel in kernels:
+                    yield pytest.param(model, kernel, size, id=f"{model}-{kernel}-{size}")
+
+
+@pytest.fixture(scope="module")
+def results():
+    measured = {}
+    yield measured
+
+    output = os.environ.get("BENCH_OUTPUT")
+    if output:
+        with open(output, "w") as f:
+            json.dump(measured, f, indent=2, sort_keys=True)
+
+    if os.environ.get("BENCH_UPDATE_BASELINE"):
+        baselines = _load_baselines()
+        baselines.update(measured)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+def _load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("model,kernel,size", list(_cases()))
+def test_benchmark(model, kernel, size, results):
+    deck = _synthetic_deck(size)
+    if model in DISCOUNTED_MODELS:
+        fsrs = DISCOUNTED_MODELS[model]()
+        kernels = _discounted_kernels(fsrs, deck)
+    else:
+        fsrs = DELAYED_MODELS[model]()
+        kernels = _delayed_kernels(fsrs, deck)
+
+    seconds = float("inf")
+    total = 0.0
+    for _ in range(MAX_ROUNDS):
+        # Measure cold caches, as a ranking mostly sees memory states for the first time
+        clear_caches()
+        if hasattr(fsrs, "transposition_cache"):
+            fsrs.transposition_cache.clear()
+
+        tic = time.perf_counter()
+        kernels[kernel]()
+        elapsed = time.perf_counter() - tic
+
+        seconds = min(seconds, elapsed)
+        total += elapsed
+        if total >= MIN_SECONDS:
+            break
+
+    key = f"{model}/{kernel}/{size}"
+    throughput = size / max(seconds, 1e-9)
+    results[key] = round(throughput)
+
+    baseline = _load_baselines().get(key)
+    if baseline is None or throughput * SLOWDOWN >= baseline:
+        return
+
+    message = (
+        f"{key}: {throughput:.0f} cards/s is more than {SLOWDOWN}x below "
+        f"the baseline of {baseline:.0f} cards/s"
+    )
+    if os.environ.get("BENCH_STRICT"):
+        pytest.fail(message)
+    warnings.warn(message)
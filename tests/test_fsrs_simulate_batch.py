@@ -0,0 +1,35 @@
+import random
+
+from fsrs.fsrs4 import FSRS4
+from fsrs.fsrs5 import FSRS5
+from fsrs.fsrs6 import FSRS6
+from fsrs.types import State
+from helpers import FSRS4_PARAMS, FSRS5_PARAMS, FSRS6_PARAMS
+
+
+def test_simulate_batch():
+    rng = random.Random(0)
+    n = 200
+    difficulties = [rng.choice([1.0, 10.0, rng.uniform(1.0, 10.0)]) for _ in range(n)]
+    stabilities = [rng.choice([0.01, 36500.0, 10 ** rng.uniform(-2, 4)]) for _ in range(n)]
+    t_reviews = [rng.choice([0.0, 0.5, rng.uniform(1, 400)]) for _ in range(n)]
+
+    for fsrs in [
+        FSRS4.from_list(FSRS4_PARAMS),
+        FSRS5.from_list(FSRS5_PARAMS),
+        FSRS6.from_list(FSRS6_PARAMS),
+    ]:
+        batch = fsrs.simulate_batch(difficulties, stabilities, t_reviews)
+        assert len(batch) == n
+
+        for i, (difficulty, stability, t_review) in enumerate(
+            zip(difficulties, stabilities, t_reviews)
+        ):
+            (prob_again, state_again), (prob_good, state_good) = fsrs.simulate(
+                State(difficulty, stability), t_review
+            )
+
+            assert batch.probs_again[i] == prob_again
+            assert batch.probs_good[i] == prob_good
+            assert State(batch.difficulties_again[i], batch.stabilities_again[i]) == state_again
+            assert State(batch.difficulties_good[i], batch.stabilities_good[i]) == state_good
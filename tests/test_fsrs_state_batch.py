@@ -0,0 +1,85 @@
+import pickle
+import random
+
+import pytest
+
+from fsrs.fsrs6 import FSRS6
+from fsrs.types import State, StateBatch
+from helpers import FSRS6_PARAMS
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+
+
+def test_state_slots_and_pickle():
+    state = State(5.0, 10.0)
+
+    assert not hasattr(state, "__dict__")
+    assert pickle.loads(pickle.dumps(state)) == state
+
+
+def test_state_batch_round_trip():
+    rng = random.Random(0)
+    states = [State(rng.uniform(1.0, 10.0), 10 ** rng.uniform(-2, 4)) for _ in range(100)]
+    elapsed_days = [float(rng.randint(0, 365)) for _ in range(100)]
+
+    batch = StateBatch.from_states(states, elapsed_days)
+
+    assert len(batch) == 100
+    assert batch.to_states() == states
+    assert list(batch) == states
+    assert batch[7] == states[7]
+    assert batch.nbytes == 3 * 8 * 100
+
+    # Slices share the memory of the batch
+    part = batch[10:20]
+    assert part.to_states() == states[10:20]
+    assert list(part.elapsed_days) == elapsed_days[10:20]
+    assert part.stabilities.obj is batch.stabilities.obj
+
+    with pytest.raises(ValueError):
+        StateBatch([1.0, 2.0], [1.0])
+    with pytest.raises(ValueError):
+        StateBatch.from_states(states).columns("elapsed_days")
+
+
+def test_state_batch_accepted_by_batch_methods():
+    rng = random.Random(0)
+    n = 200
+    difficulties = [rng.uniform(1.0, 10.0) for _ in range(n)]
+    stabilities = [10 ** rng.uniform(-2, 4) for _ in range(n)]
+    elapsed_days = [rng.uniform(0, 400) for _ in range(n)]
+    batch = StateBatch(difficulties, stabilities, elapsed_days)
+
+    fsrs = FSRS6.from_list(FSRS6_PARAMS)
+    assert fsrs.simulate_batch(batch) == fsrs.simulate_batch(
+        difficulties, stabilities, elapsed_days
+    )
+
+    knowledge = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+    assert list(knowledge.exp_knowledge_gain_batch(batch[50:], lookahead=2)) == list(
+        knowledge.exp_knowledge_gain_batch(
+            difficulties[50:], stabilities[50:], elapsed_days[50:], lookahead=2
+        )
+    )
+    assert list(knowledge.exp_knowledge_gain_bound_batch(batch)) == list(
+        knowledge.exp_knowledge_gain_bound_batch(stabilities, elapsed_days)
+    )
+
+
+def test_state_batch_without_elapsed_days():
+    rng = random.Random(1)
+    n = 100
+    difficulties = [rng.uniform(1.0, 10.0) for _ in range(n)]
+    stabilities = [10 ** rng.uniform(-2, 4) for _ in range(n)]
+    elapsed_days = [rng.uniform(0, 400) for _ in range(n)]
+    batch = StateBatch(difficulties, stabilities)
+
+    # The elapsed days are passed after the batch
+    fsrs = FSRS6.from_list(FSRS6_PARAMS)
+    assert fsrs.simulate_batch(batch, elapsed_days) == fsrs.simulate_batch(
+        difficulties, stabilities, elapsed_days
+    )
+
+    knowledge = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+    assert list(knowledge.exp_knowledge_gain_batch(batch, elapsed_days)) == list(
+        knowledge.exp_knowledge_gain_batch(difficulties, stabilities, elapsed_days)
+    )
@@ -1,7 +1,9 @@
 import math
+import random
 
 from fsrs.fsrs4 import DECAY
 from fsrs.types import State
+from helpers import FSRS4_PARAMS, FSRS5_PARAMS, FSRS6_PARAMS, random_cards
 from longterm_knowledge.delayed.fsrs4 import FSRS4KnowledgeDelayed
 from longterm_knowledge.delayed.fsrs5 import FSRS5KnowledgeDelayed
 from longterm_knowledge.delayed.fsrs6 import FSRS6KnowledgeDelayed
@@ -30,3 +32,52 @@ def test_knowledge_delayed():
                 assert math.isclose(
                     knowledge_fsrs6, knowledge_fsrs4, rel_tol=1e-9
                 ), f"Knowledge FSRS6 vs FSRS4 mismatch for state {state}: {knowledge_fsrs6} != {knowledge_fsrs4}"
+
+
+def test_knowledge_delayed_batch():
+    rng = random.Random(0)
+    n = 300
+    difficulties, stabilities, elapsed_days = random_cards(n)
+    # Some cards are due too close to the exam for their subtrees to be expanded
+    todays = [float(rng.randint(0, 500)) for _ in range(n)]
+
+    for fsrs in [
+        FSRS4KnowledgeDelayed.from_list_with_due(FSRS4_PARAMS, due=500.0),
+        FSRS5KnowledgeDelayed.from_list_with_due(FSRS5_PARAMS, due=500.0),
+        FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=500.0),
+    ]:
+        states = [State(d, s) for d, s in zip(difficulties, stabilities)]
+        knowledges = fsrs.calc_knowledge_batch(stabilities, elapsed_days, todays)
+        gains = fsrs.exp_knowledge_gain_batch(difficulties, stabilities, elapsed_days, todays)
+        future_gains = fsrs.exp_knowledge_gain_future_batch(
+            difficulties, stabilities, elapsed_days, todays
+        )
+        bounds = fsrs.exp_knowledge_gain_bound_batch(stabilities, elapsed_days, todays)
+
+        for i, state in enumerate(states):
+            args = (state, elapsed_days[i], todays[i])
+            assert math.isclose(knowledges[i], fsrs.calc_knowledge(*args), abs_tol=1e-15)
+            assert math.isclose(gains[i], fsrs.exp_knowledge_gain(*args), abs_tol=1e-15)
+            assert math.isclose(
+                future_gains[i], fsrs.exp_knowledge_gain_future(*args), abs_tol=1e-12
+            )
+            assert future_gains[i] <= bounds[i]
+
+        # Bounds depend on each card's state, not only on the day
+        assert len(set(bounds)) > len(set(todays))
+
+
+def test_knowledge_delayed_several_dues():
+    state = State(difficulty=5.0, stability=10.0)
+    early = FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=100.0)
+    late = FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=500.0)
+
+    assert early is not late
+    assert early is FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=100.0)
+    assert early is FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, 100)
+    assert early is FSRS6KnowledgeDelayed.from_tuple_with_due(tuple(FSRS6_PARAMS), due=100)
+    assert (early.due, late.due) == (100.0, 500.0)
+    assert early.calc_knowledge(state, 0.0, 0.0) > late.calc_knowledge(state, 0.0, 0.0)
+    assert list(early.exp_knowledge_gain_bound_batch([10.0], [0.0], [0.0])) != list(
+        late.exp_knowledge_gain_bound_batch([10.0], [0.0], [0.0])
+    )
@@ -0,0 +1,66 @@
+from fsrs.types import State
+from helpers import FSRS4_PARAMS, FSRS5_PARAMS, FSRS6_PARAMS, random_cards
+from longterm_knowledge.discounted import BATCH_TOL
+from longterm_knowledge.discounted.fsrs4 import FSRS4KnowledgeDiscounted
+from longterm_knowledge.discounted.fsrs5 import FSRS5KnowledgeDiscounted
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+
+
+def test_exp_knowledge_gain_batch():
+    difficulties, stabilities, elapsed_days = random_cards(100)
+
+    for fsrs in [
+        FSRS4KnowledgeDiscounted.from_list(FSRS4_PARAMS),
+        FSRS5KnowledgeDiscounted.from_list(FSRS5_PARAMS),
+        FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS),
+    ]:
+        for lookahead in [0, 1, 2]:
+            gains = fsrs.exp_knowledge_gain_batch(
+                difficulties, stabilities, elapsed_days, lookahead=lookahead
+            )
+            assert len(gains) == len(difficulties)
+
+            for difficulty, stability, elapsed, gain in zip(
+                difficulties, stabilities, elapsed_days, gains
+            ):
+                state = State(difficulty, stability)
+                expected = fsrs.exp_knowledge_gain(state, elapsed, lookahead=lookahead)
+                assert (
+                    abs(gain - expected) <= BATCH_TOL
+                ), f"Batch mismatch for {type(fsrs).__name__} lookahead={lookahead} state={state} elapsed={elapsed}: {gain} != {expected}"
+
+
+def test_exp_knowledge_gain_batch_empty():
+    fsrs = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+    assert len(fsrs.exp_knowledge_gain_batch([], [], [], lookahead=2)) == 0
+
+
+def test_knowledge_gain_future_batch():
+    difficulties, stabilities, elapsed_days = random_cards(100, seed=1)
+    fsrs = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+
+    gains = fsrs._calc_knowledge_gain_future_batch(difficulties, stabilities, elapsed_days)
+
+    for difficulty, stability, elapsed, gain in zip(
+        difficulties, stabilities, elapsed_days, gains
+    ):
+        expected = fsrs._calc_knowledge_gain_future(State(difficulty, stability), elapsed)
+        assert abs(gain - expected) <= BATCH_TOL
+
+
+def test_exp_knowledge_gain_bound():
+    difficulties, stabilities, elapsed_days = random_cards(100, seed=2)
+
+    for fsrs in [
+        FSRS4KnowledgeDiscounted.from_list(FSRS4_PARAMS),
+        FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS),
+    ]:
+        bounds = fsrs.exp_knowledge_gain_bound_batch(stabilities, elapsed_days)
+
+        for difficulty, stability, elapsed, bound in zip(
+            difficulties, stabilities, elapsed_days, bounds
+        ):
+            state = State(difficulty, stability)
+            assert abs(bound - fsrs.exp_knowledge_gain_bound(state, elapsed)) <= BATCH_TOL
+            for lookahead in [0, 1, 2]:
+                assert fsrs.exp_knowledge_gain(state, elapsed, lookahead=lookahead) <= bound
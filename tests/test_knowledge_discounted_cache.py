@@ -0,0 +1,93 @@
+import random
+
+from fsrs.cache import LRUCache, cache_stats, clear_caches
+from fsrs.types import State
+from helpers import FSRS6_PARAMS, random_cards
+from longterm_knowledge.discounted import BATCH_TOL
+from longterm_knowledge.discounted.cache import TranspositionCache
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+    disabled = LRUCache(maxsize=0)
+    disabled.put("a", 1)
+    assert len(disabled) == 0
+
+
+def test_transposition_cache():
+    cached = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+    uncached = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+    uncached._transposition_cache = TranspositionCache(maxsize=0)
+
+    rng = random.Random(0)
+    # Cards sharing memory states, as after graduating with the same rating
+    states = [State(rng.choice([3.0, 5.0, 7.0]), rng.choice([1.0, 3.0, 10.0])) for _ in range(50)]
+
+    for state in states:
+        elapsed_days = rng.choice([1.0, 2.0, 5.0])
+        gain_cached = cached.exp_knowledge_gain(state, elapsed_days, lookahead=2)
+        gain_uncached = uncached.exp_knowledge_gain(state, elapsed_days, lookahead=2)
+
+        assert abs(gain_cached - gain_uncached) <= BATCH_TOL
+
+    stats = cached.transposition_cache.stats()
+    assert stats["simulations"]["hits"] > stats["simulations"]["misses"]
+    assert stats["knowledges"]["size"] > 0
+
+    cached.transposition_cache.reset_stats()
+    assert cached.transposition_cache.stats()["simulations"]["hits"] == 0
+
+
+def test_transposition_cache_batch():
+    cached = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+    uncached = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+    uncached._transposition_cache = TranspositionCache(maxsize=0)
+
+    # Consecutive days of the same cards, as scored by the ranking
+    difficulties, stabilities, elapsed_days = random_cards(200, seed=4)
+    days = 3
+    columns = (
+        difficulties * days,
+        stabilities * days,
+        [elapsed + day for day in range(days) for elapsed in elapsed_days],
+    )
+    gains_cached = cached.exp_knowledge_gain_batch(*columns, lookahead=2)
+    gains_uncached = uncached.exp_knowledge_gain_batch(*columns, lookahead=2)
+    assert list(gains_cached) == list(gains_uncached)
+
+    # The next day's check and the future estimator reuse the reviewed knowledge
+    stats = cached.transposition_cache.stats()["simulations"]
+    assert stats["hits"] > 0
+    assert stats["misses"] == stats["size"]
+
+    # The scalar path shares the expansions of the batch path
+    hits = stats["hits"]
+    cached.exp_knowledge_gain(State(difficulties[0], stabilities[0]), elapsed_days[0], lookahead=1)
+    assert cached.transposition_cache.stats()["simulations"]["hits"] > hits
+
+
+def test_fsrs_caches():
+    clear_caches()
+    fsrs = FSRS6KnowledgeDiscounted.from_tuple(FSRS6_PARAMS)
+    assert FSRS6KnowledgeDiscounted.from_tuple(FSRS6_PARAMS) is fsrs
+
+    state = State(5.0, 10.0)
+    assert fsrs.simulate(state, 3.0) is fsrs.simulate(state, 3.0)
+
+    stats = cache_stats()
+    assert stats["from_tuple"]["hits"] >= 1
+    assert stats["simulate"]["size"] >= 1
+
+    clear_caches()
+    assert cache_stats()["simulate"]["size"] == 0
+    assert FSRS6KnowledgeDiscounted.from_tuple(FSRS6_PARAMS) is not fsrs
@@ -4,7 +4,11 @@ from typing import Optional
 
 from fsrs.fsrs4 import DECAY, FACTOR
 from longterm_knowledge.discounted import GAMMA
-from longterm_knowledge.discounted.utils import knowledge_discounted_integral
+from longterm_knowledge.discounted.utils import (
+    knowledge_discounted_integral,
+    knowledge_discounted_integral_batch,
+    knowledge_discounted_integral_erfcx,
+)
 
 
 def erfcx(x):
@@ -151,3 +155,51 @@ def test_knowledge_integral_scipy():
             assert math.isclose(
                 knowledge_fsrs6, knowledge_scipy, rel_tol=1e-9
             ), f"Knowledge EMA mismatch for stability {stability}: {knowledge_fsrs6} != {knowledge_scipy}"
+
+
+def test_knowledge_integral_batch():
+    stabilities = [0.0, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0, 36500.0]
+    for decay in [-0.1, -0.5]:
+        factor = 0.9 ** (1 / decay) - 1
+        for t_begin, t_end in [(0.0, None), (30.0, None), (30.0, 365.0)]:
+            knowledges = knowledge_discounted_integral_batch(
+                stabilities=stabilities,
+                decay=decay,
+                factor=factor,
+                t_begin=[t_begin] * len(stabilities),
+                t_end=None if t_end is None else [t_end] * len(stabilities),
+                tol=1e-14,
+            )
+            for stability, knowledge_batch in zip(stabilities, knowledges):
+                knowledge = knowledge_discounted_integral(
+                    stability=stability,
+                    decay=decay,
+                    factor=factor,
+                    t_begin=t_begin,
+                    t_end=t_end,
+                    tol=1e-14,
+                )
+
+                assert math.isclose(
+                    knowledge_batch, knowledge, rel_tol=1e-12, abs_tol=1e-15
+                ), f"Knowledge batch mismatch for stability {stability}: {knowledge_batch} != {knowledge}"
+
+
+def test_knowledge_integral_erfcx():
+    for stability in [0.01, 0.1, 1.0, 10.0, 100.0, 1000.0, 36500.0]:
+        for t_begin, t_end in [(None, None), (0.0, None), (30.0, None), (30.0, 365.0)]:
+            knowledge_erfcx = knowledge_discounted_integral_erfcx(
+                stability=stability, factor=FACTOR, t_begin=t_begin, t_end=t_end
+            )
+            knowledge_fsrs6 = knowledge_discounted_integral(
+                stability=stability,
+                decay=DECAY,
+                factor=FACTOR,
+                t_begin=t_begin,
+                t_end=t_end,
+                tol=1e-14,
+            )
+
+            assert math.isclose(
+                knowledge_erfcx, knowledge_fsrs6, rel_tol=1e-9
+            ), f"Knowledge erfcx mismatch for stability {stability}: {knowledge_erfcx} != {knowledge_fsrs6}"
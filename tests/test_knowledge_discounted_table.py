@@ -0,0 +1,58 @@
+import math
+import random
+
+import pytest
+
+from fsrs.types import State
+from helpers import FSRS6_PARAMS
+from longterm_knowledge.discounted import TABLE_TOL
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+from longterm_knowledge.discounted.table import KnowledgeTable
+from longterm_knowledge.discounted.utils import knowledge_discounted_integral
+
+
+def test_knowledge_table():
+    # Build a private instance so the table does not leak into the from_tuple cache
+    fsrs = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+    table = fsrs.enable_knowledge_table()
+
+    stats = table.stats()
+    assert stats["max_error"] <= TABLE_TOL
+    assert stats["nbytes"] == 2 * 8 * stats["nodes"]
+
+    rng = random.Random(0)
+    stabilities = [10 ** rng.uniform(-2, 4.6) for _ in range(1000)]
+    elapsed_days = [rng.choice([0.0, rng.uniform(0, 1000)]) for _ in range(1000)]
+    knowledges = fsrs.calc_knowledge_batch(stabilities, elapsed_days)
+
+    for stability, elapsed, knowledge_batch in zip(stabilities, elapsed_days, knowledges):
+        exact = knowledge_discounted_integral(
+            stability=stability,
+            decay=fsrs.decay,
+            factor=fsrs.factor,
+            t_begin=elapsed,
+            tol=1e-14,
+        )
+        knowledge = fsrs.calc_knowledge(State(5.0, stability), elapsed)
+
+        assert knowledge == knowledge_batch
+        assert (
+            abs(knowledge - exact) <= TABLE_TOL
+        ), f"Table mismatch for stability {stability}, elapsed {elapsed}: {knowledge} != {exact}"
+
+    fsrs.disable_knowledge_table()
+    assert math.isclose(
+        fsrs.calc_knowledge(State(5.0, 10.0), 3.0),
+        knowledge_discounted_integral(10.0, fsrs.decay, fsrs.factor, t_begin=3.0),
+        rel_tol=1e-8,
+    )
+
+
+def test_knowledge_table_unreachable_tolerance():
+    fsrs = FSRS6KnowledgeDiscounted(FSRS6_PARAMS)
+
+    with pytest.raises(ValueError):
+        KnowledgeTable(fsrs.decay, fsrs.factor, tol=1e-30)
+    with pytest.raises(ValueError):
+        fsrs.enable_knowledge_table(tol=1e-30)
+    assert fsrs._knowledge_table is None
@@ -0,0 +1,78 @@
+import sqlite3
+
+from last_review_index import REVLOG_CRAM, LastReviewIndex
+
+
+class Revlog:
+    """The query methods of Anki's DBProxy, over an in-memory revlog table."""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute(
+            "CREATE TABLE revlog "
+            "(id INTEGER PRIMARY KEY, cid INTEGER, ease INTEGER, type INTEGER, factor INTEGER)"
+        )
+
+    def add(self, id: int, cid: int, ease: int = 3, type: int = 1, factor: int = 2500) -> None:
+        self.db.execute("INSERT INTO revlog VALUES (?, ?, ?, ?, ?)", (id, cid, ease, type, factor))
+
+    def delete(self, id: int) -> None:
+        self.db.execute("DELETE FROM revlog WHERE id = ?", (id,))
+
+    def first(self, sql: str, *args):
+        return self.db.execute(sql, args).fetchone()
+
+    def scalar(self, sql: str, *args):
+        return self.db.execute(sql, args).fetchone()[0]
+
+    def all(self, sql: str, *args):
+        return self.db.execute(sql, args).fetchall()
+
+
+def test_last_review_index_filters_revlog():
+    revlog = Revlog()
+    revlog.add(1_000_000, cid=1)
+    revlog.add(2_000_000, cid=1, ease=0)
+    revlog.add(3_000_000, cid=2, type=REVLOG_CRAM, factor=0)
+    revlog.add(4_000_000, cid=2, type=REVLOG_CRAM)
+
+    index = LastReviewIndex(sqlite3.connect(":memory:"), revlog)
+    index.check()
+    assert index.get(1) == 1000
+    assert index.get(2) == 4000
+    assert index.get(3) is None
+
+
+def test_last_review_index_answer_and_undo():
+    revlog = Revlog()
+    revlog.add(1_000_000, cid=1)
+    db = sqlite3.connect(":memory:")
+    index = LastReviewIndex(db, revlog)
+    index.check()
+
+    revlog.add(5_000_000, cid=1)
+    index.record_answer()
+    assert index.get(1) == 5000
+
+    # Undo removes the answer's revlog entry
+    revlog.delete(5_000_000)
+    index.check(full=True)
+    assert index.get(1) == 1000
+
+    # The index is persisted along with its watermark
+    assert LastReviewIndex(db, revlog).get(1) == 1000
+
+
+def test_last_review_index_rebuilds_after_sync():
+    revlog = Revlog()
+    revlog.add(1_000_000, cid=1)
+    revlog.add(3_000_000, cid=2)
+    index = LastReviewIndex(sqlite3.connect(":memory:"), revlog)
+    index.check()
+
+    # A synced review below the largest id is only caught by a full check
+    revlog.add(2_000_000, cid=1)
+    index.check(full=False)
+    assert index.get(1) == 1000
+    index.check(full=True)
+    assert index.get(1) == 2000
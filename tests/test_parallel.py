@@ -0,0 +1,90 @@
+import os
+
+from helpers import FSRS5_PARAMS, FSRS6_PARAMS, random_cards
+from longterm_knowledge.delayed.fsrs6 import FSRS6KnowledgeDelayed
+from longterm_knowledge.discounted.fsrs5 import FSRS5KnowledgeDiscounted
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+from longterm_knowledge.parallel import ParallelScorer
+
+
+def test_parallel_scorer_matches_in_process():
+    difficulties, stabilities, elapsed_days = random_cards(500)
+
+    for fsrs in [
+        FSRS5KnowledgeDiscounted.from_list(FSRS5_PARAMS),
+        FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS),
+    ]:
+        scorer = ParallelScorer(fsrs, workers=2, threshold=0, chunk_size=64)
+        try:
+            for lookahead in [0, 2]:
+                expected = fsrs.exp_knowledge_gain_batch(
+                    difficulties, stabilities, elapsed_days, lookahead=lookahead
+                )
+                actual = scorer.map(
+                    "exp_knowledge_gain_batch",
+                    difficulties,
+                    stabilities,
+                    elapsed_days,
+                    lookahead=lookahead,
+                )
+                assert list(actual) == list(expected)
+
+            expected = fsrs.exp_knowledge_gain_bound_batch(stabilities, elapsed_days)
+            actual = scorer.map("exp_knowledge_gain_bound_batch", stabilities, elapsed_days)
+            assert list(actual) == list(expected)
+        finally:
+            scorer.close()
+
+
+def test_parallel_scorer_below_threshold_stays_in_process():
+    fsrs = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+    difficulties, stabilities, elapsed_days = random_cards(10)
+
+    scorer = ParallelScorer(fsrs, workers=2, threshold=100)
+    actual = scorer.map("exp_knowledge_gain_batch", difficulties, stabilities, elapsed_days)
+
+    assert scorer._executor is None
+    assert list(actual) == list(
+        fsrs.exp_knowledge_gain_batch(difficulties, stabilities, elapsed_days)
+    )
+
+
+def test_parallel_scorer_keeps_due_date():
+    difficulties, stabilities, elapsed_days = random_cards(200)
+    todays = [0.0] * len(difficulties)
+
+    for due in [100.0, 500.0]:
+        fsrs = FSRS6KnowledgeDelayed.from_list_with_due(FSRS6_PARAMS, due=due)
+        scorer = ParallelScorer(fsrs, workers=2, threshold=0, chunk_size=64)
+        try:
+            expected = fsrs.exp_knowledge_gain_future_batch(
+                difficulties, stabilities, elapsed_days, todays
+            )
+            actual = scorer.map(
+                "exp_knowledge_gain_future_batch", difficulties, stabilities, elapsed_days, todays
+            )
+            assert list(actual) == list(expected)
+        finally:
+            scorer.close()
+
+
+class CrashingKnowledge(FSRS6KnowledgeDiscounted):
+    def crash_batch(self, stabilities, elapsed_days):
+        # Workers inherit the environment of the test
+        if str(os.getpid()) != os.environ["PARALLEL_TEST_PARENT"]:
+            os._exit(1)
+        return self.exp_knowledge_gain_bound_batch(stabilities, elapsed_days)
+
+
+def test_parallel_scorer_falls_back_when_the_pool_breaks(monkeypatch):
+    monkeypatch.setenv("PARALLEL_TEST_PARENT", str(os.getpid()))
+    fsrs = CrashingKnowledge.from_list(FSRS6_PARAMS)
+    _, stabilities, elapsed_days = random_cards(200)
+
+    scorer = ParallelScorer(fsrs, workers=2, threshold=0, chunk_size=64)
+    try:
+        actual = scorer.map("crash_batch", stabilities, elapsed_days)
+        assert scorer.broken
+        assert list(actual) == list(fsrs.exp_knowledge_gain_bound_batch(stabilities, elapsed_days))
+    finally:
+        scorer.close()
@@ -0,0 +1,59 @@
+import json
+
+from helpers import FSRS6_PARAMS
+from longterm_knowledge.discounted.fsrs6 import FSRS6KnowledgeDiscounted
+from profiling import Profiler, profiler
+
+
+def test_profiler_timers_and_counters():
+    p = Profiler()
+    p.count("a")
+    p.count("a", 2)
+    with p.timer("t"):
+        pass
+    with p.timer("t"):
+        pass
+
+    report = p.report({"extra": 1})
+    assert report["counters"] == {"a": 3}
+    assert report["timers"]["t"]["calls"] == 2
+    assert report["timers"]["t"]["seconds"] >= 0
+    assert report["extra"] == 1
+    assert json.loads(p.to_json())["counters"] == {"a": 3}
+
+    p.reset()
+    assert p.report()["counters"] == {}
+    assert p.report()["timers"] == {}
+
+
+def test_disabled_profiler_records_nothing():
+    p = Profiler(enabled=False)
+    p.count("a")
+    with p.timer("t"):
+        pass
+
+    report = p.report()
+    assert report["counters"] == {}
+    assert report["timers"] == {}
+
+
+def test_kernels_report_to_profiler():
+    fsrs = FSRS6KnowledgeDiscounted.from_list(FSRS6_PARAMS)
+
+    enabled = profiler.enabled
+    profiler.enabled = True
+    profiler.reset()
+    try:
+        fsrs.exp_knowledge_gain_batch([5.0, 6.0], [10.0, 30.0], [3.0, 40.0], lookahead=2)
+        report = profiler.report()
+    finally:
+        profiler.enabled = enabled
+        profiler.reset()
+
+    assert report["counters"]["exp_knowledge_gain_batch.cards"] == 2
+    assert "exp_knowledge_gain_batch.future" in report["timers"]
+    assert (
+        report["counters"].get("lower_gamma_series.iterations", 0)
+        + report["counters"].get("log_upper_gamma_cf.iterations", 0)
+        > 0
+    )
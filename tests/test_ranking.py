@@ -0,0 +1,140 @@
+import random
+
+from longterm_knowledge.ranking import RankedQueue, top_k
+
+
+def test_top_k_matches_sorted():
+    rng = random.Random(0)
+
+    for n in [0, 1, 10, 1000]:
+        # Round the scores so that ties are common
+        scores = [round(rng.uniform(-1, 1), 1) for _ in range(n)]
+        items = list(range(n))
+        expected = sorted(items, key=scores.__getitem__, reverse=True)
+
+        for k in [0, 1, 5, n, n + 1]:
+            bounds = [score + rng.uniform(0, 0.5) for score in scores]
+            for chunk_size in [1, 7, 256]:
+                for item_bounds in [None, bounds]:
+                    selected = top_k(
+                        items,
+                        k,
+                        score=lambda chunk: [scores[i] for i in chunk],
+                        bounds=item_bounds,
+                        chunk_size=chunk_size,
+                    )
+                    assert [item for item, _ in selected] == expected[:k]
+                    assert [score for _, score in selected] == [scores[i] for i in expected[:k]]
+
+
+def test_top_k_skips_bounded_items():
+    scores = [float(i) for i in range(1000)]
+    scored = []
+
+    def score(chunk):
+        scored.extend(chunk)
+        return [scores[i] for i in chunk]
+
+    selected = top_k(list(range(1000)), 10, score=score, bounds=scores, chunk_size=10)
+
+    assert [item for item, _ in selected] == list(range(999, 989, -1))
+    assert len(scored) == 10
+
+
+def _drain(queue):
+    items = []
+    while True:
+        top = queue.pop()
+        if top is None:
+            return items
+        items.append(top[0])
+
+
+def test_ranked_queue_matches_sorted():
+    rng = random.Random(1)
+    n = 500
+    scores = [round(rng.uniform(-1, 1), 1) for _ in range(n)]
+    expected = sorted(range(n), key=scores.__getitem__, reverse=True)
+
+    for chunk_size in [1, 16, 256]:
+        queue = RankedQueue(lambda chunk: [scores[i] for i in chunk], chunk_size=chunk_size)
+        for i in range(n):
+            queue.push(i, i, scores[i] + rng.uniform(0, 0.5))
+
+        assert len(queue) == n
+        assert _drain(queue) == expected
+        assert len(queue) == 0
+
+
+def test_ranked_queue_updates():
+    scores = {i: float(i % 7) for i in range(100)}
+    queue = RankedQueue(lambda chunk: [scores[i] for i in chunk], chunk_size=4)
+    for i in range(100):
+        queue.push(i, i, 10.0)
+
+    # Remove some items, then add back one of them
+    removed = set(range(0, 100, 3))
+    for i in removed:
+        assert queue.remove(i)
+    assert not queue.remove(0)
+    queue.push(3, 3, 10.0)
+    removed.discard(3)
+
+    # Pushing an item again moves it behind the items it ties with
+    push_order = [i for i in range(100) if i not in removed and i != 3] + [3]
+    expected = sorted(push_order, key=scores.__getitem__, reverse=True)
+    assert 0 not in queue and 3 in queue
+    assert _drain(queue) == expected
+
+
+def test_ranked_queue_scores_lazily():
+    queue = RankedQueue(lambda chunk: [float(i) for i in chunk], chunk_size=1)
+    for i in range(1000):
+        queue.push(i, i, float(i))
+
+    assert queue.peek() == (999, 999, 999.0)
+    assert queue.scored == 1
+
+
+def test_ranked_queue_scored_items():
+    scores = [0.5, 0.2, 0.9, 0.2]
+    queue = RankedQueue(lambda chunk: [scores[i] for i in chunk])
+    queue.push(0, 0, 1.0)
+    queue.push(1, 1, scores[1], scored=True)
+    queue.push(2, 2, 1.0)
+    queue.push(3, 3, scores[3], scored=True)
+
+    assert queue.get_score(0) is None
+    assert queue.get_score(1) == 0.2
+    assert queue.peek()[0] == 2
+    assert queue.get_score(2) == 0.9
+    assert queue.get_score(4) is None
+
+    assert _drain(queue) == [2, 0, 1, 3]
+    assert queue.scored == 2
+
+
+def test_ranked_queue_prefetch():
+    rng = random.Random(2)
+    n = 200
+    scores = [round(rng.uniform(-1, 1), 1) for _ in range(n)]
+    expected = sorted(range(n), key=scores.__getitem__, reverse=True)
+    scored = []
+
+    def score(chunk):
+        scored.extend(chunk)
+        return [scores[i] for i in chunk]
+
+    queue = RankedQueue(score, chunk_size=8)
+    for i in range(n):
+        queue.push(i, i, scores[i] + rng.uniform(0, 0.5))
+
+    queue.prefetch(5)
+    assert all(queue.get_score(i) == scores[i] for i in expected[:5])
+
+    # The prefetched items come out without any more scoring
+    prefetched = len(scored)
+    assert [queue.pop()[0] for _ in range(5)] == expected[:5]
+    assert len(scored) == prefetched
+
+    assert _drain(queue) == expected[5:]